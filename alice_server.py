@@ -4,11 +4,14 @@ Processes large CSV files in chunks to avoid memory issues.
 """
 
 import grpc
+import functools
+import hashlib
 from concurrent import futures
 import numpy as np
-import pandas as pd
 import sys
 import os
+import shutil
+import tempfile
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'qkd'))
 
@@ -20,19 +23,46 @@ except ImportError as e:
     print("Run: python -m grpc_tools.protoc -I. --python_out=qkd --grpc_python_out=qkd qkd_grpc_cascade.proto")
     sys.exit(1)
 
-from qkd.parameter_estimation import parameter_estimation
-from qkd.sifting import sifting
-from qkd.cascade_wrapper import Key
+from qkd.parameter_estimation import parameter_estimation, PE_SEED
+from qkd.sifting import sift_csv_chunks, concatenate_chunks
+from qkd.cascade_wrapper import Key, ParityPrefix, shuffled_parity_prefix, PARITY_PREFIX_CACHE_SIZE
 from qkd.cascade_open_source.shuffle import Shuffle
 
 
-def sifting_chunked(csv_file, chunk_size=1_000_000):
+# Threads serving gRPC calls. Parity requests are short and Bob keeps one stream
+# per reconciliation open, so size for many concurrent streams, not for CPU work.
+GRPC_IO_WORKERS = max(32, (os.cpu_count() or 1) * 4)
+MAX_CONCURRENT_STREAMS = 1000
+
+# Optional on-disk copy of the unshuffled key's prefix parities (--cache-dir), one
+# directory per key. The files hold Alice's key, so directories are private (0o700).
+DEFAULT_DISK_CACHE_DIR = os.path.join('~', '.qkd_cache')
+# Key directories kept in the cache; the least recently used ones are deleted
+DISK_CACHE_MAX_KEYS = 8
+# Part of the cache directory name; bump when shuffle identifiers map to new permutations
+# or the file format changes (3: files hold the packed shuffled key words)
+DISK_CACHE_VERSION = 3
+
+# Parities between two "Sent ... parities so far" progress lines
+PROGRESS_INTERVAL = 100
+
+# HTTP/2 keepalive and flow control. Bob pings every KEEPALIVE_TIME_MS while a call
+# is open; the server must accept pings that often or it answers with GOAWAY.
+KEEPALIVE_TIME_MS = 10_000
+KEEPALIVE_TIMEOUT_MS = 5_000
+MIN_PING_INTERVAL_MS = 5_000
+HTTP2_LOOKAHEAD_BYTES = 4 * 1024 * 1024   # per-stream flow-control window
+HTTP2_MAX_FRAME_SIZE = 16 * 1024 * 1024 - 1
+
+
+def sifting_chunked(csv_file, chunk_size=1_000_000, workers=None):
     """
     Sift data by reading CSV in chunks to avoid memory overflow.
     
     Args:
         csv_file: Path to CSV file
         chunk_size: Number of rows to process at once
+        workers: Number of processes parsing and sifting chunks, defaults to the CPU count
         
     Returns:
         alice_bits, bob_bits as numpy arrays
@@ -44,10 +74,9 @@ def sifting_chunked(csv_file, chunk_size=1_000_000):
     total_rows = 0
     sifted_count = 0
     
-    for chunk_num, chunk in enumerate(pd.read_csv(csv_file, chunksize=chunk_size), start=1):
-        total_rows += len(chunk)
-
-        alice_bits, bob_bits = sifting(chunk)
+    chunks = sift_csv_chunks(csv_file, chunk_size, workers)
+    for chunk_num, (alice_bits, bob_bits, raw_rows) in enumerate(chunks, start=1):
+        total_rows += raw_rows
 
         if len(alice_bits) > 0:
             alice_list.append(alice_bits)
@@ -57,9 +86,9 @@ def sifting_chunked(csv_file, chunk_size=1_000_000):
         if chunk_num % 10 == 0:
             print(f"  Processed {total_rows:,} rows, sifted {sifted_count:,} bits so far...")
     
-    # Concatenate all chunks
-    alice_bits = np.concatenate(alice_list)
-    bob_bits = np.concatenate(bob_list)
+    # Join all chunks into preallocated arrays
+    alice_bits = concatenate_chunks(alice_list, sifted_count)
+    bob_bits = concatenate_chunks(bob_list, sifted_count)
     
     print(f"[Alice] Total: {total_rows:,} rows -> {len(alice_bits):,} sifted bits")
     
@@ -69,36 +98,141 @@ def sifting_chunked(csv_file, chunk_size=1_000_000):
 class AliceCascadeService(qkd_grpc_cascade_pb2_grpc.CascadeServiceServicer):
     """Alice's gRPC service."""
     
-    def __init__(self, alice_key):
+    def __init__(self, alice_key, cache_dir=None):
+        """
+        Args:
+            alice_key: Key object containing Alice's key
+            cache_dir: If set, the prefix parities of the unshuffled key (the only shuffle
+                reused across runs) are also saved under this directory and reloaded by
+                later servers running on the same key. None disables it.
+        """
         self.alice_key = alice_key
         self.total_parities_sent = 0
+        self._get_parity_prefix = functools.lru_cache(maxsize=PARITY_PREFIX_CACHE_SIZE)(
+            self._load_parity_prefix
+        )
+        
+        self._disk_cache_dir = None
+        if cache_dir is not None:
+            key_hash = hashlib.blake2b(alice_key.words.tobytes(), digest_size=16)
+            key_hash.update(str(alice_key.get_size()).encode())
+            key_hash.update(str(DISK_CACHE_VERSION).encode())
+            cache_root = os.path.expanduser(cache_dir)
+            self._disk_cache_dir = os.path.join(cache_root, key_hash.hexdigest())
+            os.makedirs(cache_root, mode=0o700, exist_ok=True)
+            os.makedirs(self._disk_cache_dir, mode=0o700, exist_ok=True)
+            os.utime(self._disk_cache_dir)  # most recently used
+            self._prune_disk_cache(cache_root)
+            print(f"[Alice] Caching prefix parities in {self._disk_cache_dir}")
+        
         print(f"[Alice] Initialized with key of {alice_key.get_size():,} bits")
     
+    def _prune_disk_cache(self, cache_root):
+        """Delete all but the DISK_CACHE_MAX_KEYS most recently used key directories"""
+        try:
+            key_dirs = [entry for entry in os.scandir(cache_root) if entry.is_dir()]
+        except OSError:
+            return
+        key_dirs.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in key_dirs[DISK_CACHE_MAX_KEYS:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    
+    def _load_parity_prefix(self, shuffle_id):
+        """Prefix parities for shuffle_id, from the disk cache when enabled"""
+        # Random shuffles get fresh seeds every run and are never asked for again, so only
+        # the unshuffled key is worth keeping on disk
+        if (self._disk_cache_dir is None or
+                Shuffle.get_algorithm_from_identifier(shuffle_id) != Shuffle.SHUFFLE_KEEP_SAME):
+            return self._compute_parity_prefix(shuffle_id)
+        
+        path = os.path.join(self._disk_cache_dir, f"{shuffle_id}.npy")
+        try:
+            return ParityPrefix(np.load(path))
+        except (OSError, ValueError, EOFError):
+            pass  # not cached yet (or a partial file): recompute
+        
+        prefix = self._compute_parity_prefix(shuffle_id)
+        self._save_parity_prefix(path, prefix)
+        return prefix
+    
+    def _save_parity_prefix(self, path, prefix):
+        """Write prefix to the disk cache; on failure, warn and serve it from memory only"""
+        tmp_path = None
+        try:
+            # Write then rename, so a concurrent reader never sees a half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=self._disk_cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, prefix.words)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[Alice] WARNING: Could not cache prefix parities in {path} - {e}")
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+    
+    def _compute_parity_prefix(self, shuffle_id):
+        """
+        Packed prefix parities of Alice's key shuffled by shuffle_id: the parities of
+        shuffle ranges [start, end) are prefix.range_parities(starts, ends).
+        Alice's key never changes, so the prefix stays valid for the server's lifetime.
+        """
+        shuffle = Shuffle.create_shuffle_from_identifier(shuffle_id)
+        return shuffled_parity_prefix(self.alice_key, shuffle)
+    
     def StartReconciliation(self, request, context):
         print(f"\n[Alice] Starting reconciliation with algorithm: {request.algorithm_name}")
         self.total_parities_sent = 0
         return qkd_grpc_cascade_pb2.Empty()
     
-    def AskParities(self, request, context):
-        parities = []
+    def AskParities(self, request, context, stream_shuffle_ids=None):
+        if request.stream_shuffle_refs:
+            # Stream form: refs index the shuffle IDs sent so far on this stream
+            if stream_shuffle_ids is None:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                              "stream_shuffle_refs is only valid on AskParitiesStream")
+            stream_shuffle_ids.extend(request.shuffle_ids)
+            shuffle_ids = stream_shuffle_ids
+            shuffle_refs = np.array(request.stream_shuffle_refs, dtype=np.int64)
+            starts = np.array(request.starts, dtype=np.int64)
+            ends = np.array(request.ends, dtype=np.int64)
+        elif request.blocks:
+            # BlockInfo form: one message per block
+            shuffle_ids, shuffle_refs = np.unique([block_info.shuffle_id for block_info in request.blocks],
+                                                  return_inverse=True)
+            starts = np.array([block_info.start_index for block_info in request.blocks], dtype=np.int64)
+            ends = np.array([block_info.end_index for block_info in request.blocks], dtype=np.int64)
+        else:
+            shuffle_ids = request.shuffle_ids
+            shuffle_refs = np.array(request.shuffle_refs, dtype=np.int64)
+            starts = np.array(request.starts, dtype=np.int64)
+            ends = np.array(request.ends, dtype=np.int64)
         
-        for block_info in request.blocks:
-            shuffle_id = int(block_info.shuffle_id)
-            shuffle = Shuffle.create_shuffle_from_identifier(shuffle_id)
-            
-            parity = shuffle.calculate_parity(
-                self.alice_key,
-                block_info.start_index,
-                block_info.end_index
-            )
-            
-            parities.append(parity)
-            self.total_parities_sent += 1
+        parities = np.empty(len(starts), dtype=np.uint8)
+        for shuffle_ref in np.unique(shuffle_refs):
+            prefix = self._get_parity_prefix(int(shuffle_ids[shuffle_ref]))
+            selected = shuffle_refs == shuffle_ref
+            parities[selected] = prefix.range_parities(starts[selected], ends[selected])
         
-        if self.total_parities_sent % 100 == 0:
+        # Requests carry many parities, so report each time a multiple of
+        # PROGRESS_INTERVAL is crossed rather than exactly reached
+        previous_total = self.total_parities_sent
+        self.total_parities_sent += len(parities)
+        if self.total_parities_sent // PROGRESS_INTERVAL > previous_total // PROGRESS_INTERVAL:
             print(f"[Alice] Sent {self.total_parities_sent:,} parities so far...")
         
-        return qkd_grpc_cascade_pb2.ParityResponse(parities=parities)
+        return qkd_grpc_cascade_pb2.ParityResponse(
+            parities_packed=np.packbits(parities, bitorder='little').tobytes(),
+            count=len(parities)
+        )
+    
+    def AskParitiesStream(self, request_iterator, context):
+        # One response per request, in order, over a single long-lived stream. Shuffle
+        # IDs are sent once per stream and then referred to by their index here.
+        stream_shuffle_ids = []
+        for request in request_iterator:
+            yield self.AskParities(request, context, stream_shuffle_ids)
     
     def EndReconciliation(self, request, context):
         print(f"[Alice] Reconciliation ended. Total parities sent: {self.total_parities_sent:,}")
@@ -106,7 +240,7 @@ class AliceCascadeService(qkd_grpc_cascade_pb2_grpc.CascadeServiceServicer):
 
 
 def run_alice_server(port=50051, data_file="raw_data/parsed_qkd_data_partial_10M.csv", 
-                     chunk_size=1_000_000):
+                     chunk_size=1_000_000, cache_dir=None, workers=None):
     """
     Start Alice server with chunked processing.
     
@@ -114,6 +248,8 @@ def run_alice_server(port=50051, data_file="raw_data/parsed_qkd_data_partial_10M
         port: Listening port
         data_file: QKD data file
         chunk_size: CSV chunk size for reading
+        cache_dir: Directory for the on-disk prefix parity cache (None = disabled)
+        workers: Number of sifting processes (None = CPU count)
     """
     
     print("="*70)
@@ -122,15 +258,15 @@ def run_alice_server(port=50051, data_file="raw_data/parsed_qkd_data_partial_10M
     
     # 1. Load data with chunked sifting
     print(f"\n[Alice] Loading data from {data_file}")
-    alice_bits, bob_bits = sifting_chunked(data_file, chunk_size=chunk_size)
+    alice_bits, bob_bits = sifting_chunked(data_file, chunk_size=chunk_size, workers=workers)
 
     
-    np.random.seed(42)
+    rng = np.random.default_rng(PE_SEED)
     
     # 2. Parameter Estimation
     print(f"\n[Alice] Running Parameter Estimation...")
     qber, qber_low, qber_high, alice_key_bits, bob_key_bits = parameter_estimation(
-        alice_bits, bob_bits
+        alice_bits, bob_bits, rng=rng
     )
     print(f"[Alice] QBER: {qber*100:.2f}% (CI: [{qber_low*100:.2f}%, {qber_high*100:.2f}%])")
     print(f"[Alice] Key after PE: {len(alice_key_bits):,} bits")
@@ -142,12 +278,25 @@ def run_alice_server(port=50051, data_file="raw_data/parsed_qkd_data_partial_10M
     options = [
         ('grpc.max_send_message_length', 100 * 1024 * 1024),      # 100 MB
         ('grpc.max_receive_message_length', 100 * 1024 * 1024),   # 100 MB
+        ('grpc.max_concurrent_streams', MAX_CONCURRENT_STREAMS),
+        ('grpc.keepalive_time_ms', KEEPALIVE_TIME_MS),
+        ('grpc.keepalive_timeout_ms', KEEPALIVE_TIMEOUT_MS),
+        ('grpc.http2.min_ping_interval_without_data_ms', MIN_PING_INTERVAL_MS),
+        # Accept Bob's pings while no call is open (otherwise only one per two hours)
+        ('grpc.keepalive_permit_without_calls', 1),
+        ('grpc.http2.max_pings_without_data', 0),
+        ('grpc.http2.lookahead_bytes', HTTP2_LOOKAHEAD_BYTES),
+        ('grpc.http2.max_frame_size', HTTP2_MAX_FRAME_SIZE),
     ]
     
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), options=options)
+    io_executor = futures.ThreadPoolExecutor(max_workers=GRPC_IO_WORKERS,
+                                             thread_name_prefix='grpc-io')
+    # No response compression: packed parities are random bits and gzip only adds
+    # its ~20-byte framing
+    server = grpc.server(io_executor, options=options)
     
     qkd_grpc_cascade_pb2_grpc.add_CascadeServiceServicer_to_server(
-        AliceCascadeService(alice_key), 
+        AliceCascadeService(alice_key, cache_dir=cache_dir), 
         server
     )
     
@@ -179,11 +328,19 @@ if __name__ == "__main__":
                        help='QKD data file')
     parser.add_argument('--chunk-size', type=int, default=1_000_000,
                        help='CSV chunk size')
+    parser.add_argument('--cache-dir', type=str, nargs='?', const=DEFAULT_DISK_CACHE_DIR,
+                       default=None,
+                       help=f'Keep the unshuffled key\'s prefix parities on disk across restarts '
+                            f'(default dir: {DEFAULT_DISK_CACHE_DIR})')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Processes used to parse and sift the CSV (default: CPU count)')
     
     args = parser.parse_args()
     
     run_alice_server(
         port=args.port, 
         data_file=args.data,
-        chunk_size=args.chunk_size
+        chunk_size=args.chunk_size,
+        cache_dir=args.cache_dir,
+        workers=args.workers
     )
\ No newline at end of file
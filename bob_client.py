@@ -4,13 +4,14 @@ Processes large CSV files in chunks to avoid memory issues.
 """
 
 import numpy as np
-import pandas as pd
 import sys
 import argparse
 
-from qkd.parameter_estimation import parameter_estimation
-from qkd.sifting import sifting
-from qkd.privacy_amplification_open_source import HashingAlgorithm, binary_entropy
+from qkd.parameter_estimation import parameter_estimation, PE_SEED
+from qkd.sifting import sift_csv_chunks, concatenate_chunks
+from qkd.privacy_amplification_open_source import HashingAlgorithm
+from qkd.privacy_amplification import secure_key_length
+from qkd.bits import pack_bits, count_errors, bits_to_str, str_to_bits
 from qkd.cascade_wrapper import Key
 from qkd.cascade_open_source import Reconciliation
 from qkd.grpc_classical_channel import gRPCClassicalChannel
@@ -19,13 +20,14 @@ from qkd.grpc_classical_channel import gRPCClassicalChannel
 QBER_THRESHOLD = 0.11
 
 
-def sifting_chunked(csv_file, chunk_size=1_000_000):
+def sifting_chunked(csv_file, chunk_size=1_000_000, workers=None):
     """
     Sift data by reading CSV in chunks to avoid memory overflow.
     
     Args:
         csv_file: Path to CSV file
         chunk_size: Number of rows to process at once
+        workers: Number of processes parsing and sifting chunks, defaults to the CPU count
         
     Returns:
         alice_bits, bob_bits as numpy arrays
@@ -38,10 +40,9 @@ def sifting_chunked(csv_file, chunk_size=1_000_000):
     total_rows = 0
     sifted_count = 0
     
-    for chunk_num, chunk in enumerate(pd.read_csv(csv_file, chunksize=chunk_size), start=1):
-        total_rows += len(chunk)
-
-        alice_bits, bob_bits = sifting(chunk)
+    chunks = sift_csv_chunks(csv_file, chunk_size, workers)
+    for chunk_num, (alice_bits, bob_bits, raw_rows) in enumerate(chunks, start=1):
+        total_rows += raw_rows
 
         if len(alice_bits) > 0:
             alice_list.append(alice_bits)
@@ -51,9 +52,9 @@ def sifting_chunked(csv_file, chunk_size=1_000_000):
         if chunk_num % 10 == 0:
             print(f"  Processed {total_rows:,} rows, sifted {sifted_count:,} bits so far...")
     
-    # Concatenate all chunks
-    alice_bits = np.concatenate(alice_list)
-    bob_bits = np.concatenate(bob_list)
+    # Join all chunks into preallocated arrays
+    alice_bits = concatenate_chunks(alice_list, sifted_count)
+    bob_bits = concatenate_chunks(bob_list, sifted_count)
     
     print(f"[Bob] Total: {total_rows:,} rows -> {len(alice_bits):,} sifted bits")
     
@@ -63,7 +64,8 @@ def sifting_chunked(csv_file, chunk_size=1_000_000):
 def run_bob_client(server_address='localhost:50051', 
                    data_file="raw_data/parsed_qkd_data_partial_10M.csv",
                    algorithm='yanetal',
-                   chunk_size=1_000_000):
+                   chunk_size=1_000_000,
+                   workers=None):
     """
     Run Bob client for error correction with gRPC (chunked version).
     
@@ -72,6 +74,7 @@ def run_bob_client(server_address='localhost:50051',
         data_file: QKD data file
         algorithm: Cascade algorithm to use
         chunk_size: CSV chunk size
+        workers: Number of sifting processes (None = CPU count)
     """
     
     print("="*70)
@@ -80,14 +83,14 @@ def run_bob_client(server_address='localhost:50051',
     
     # 1. Load data with chunked sifting
     print(f"\n[Bob] Loading data from {data_file}")
-    alice_bits, bob_bits, total_raw_bits = sifting_chunked(data_file, chunk_size=chunk_size)
+    alice_bits, bob_bits, total_raw_bits = sifting_chunked(data_file, chunk_size=chunk_size, workers=workers)
     
-    np.random.seed(42)
+    rng = np.random.default_rng(PE_SEED)
     
     # 2. Parameter Estimation
     print(f"\n[Bob] Running Parameter Estimation...")
     qber, qber_low, qber_high, alice_key_bits, bob_key_bits = parameter_estimation(
-        alice_bits, bob_bits
+        alice_bits, bob_bits, rng=rng
     )
     
     print(f"[Bob] QBER: {qber*100:.2f}% (CI: [{qber_low*100:.2f}%, {qber_high*100:.2f}%])")
@@ -110,7 +113,9 @@ def run_bob_client(server_address='localhost:50051',
         return
     
     # 5. Start Cascade with gRPC channel
-    initial_errors = np.sum(alice_key_bits != bob_key_bits)
+    # (simulation only: Bob knows Alice's key here to report error counts)
+    alice_words = pack_bits(alice_key_bits)
+    initial_errors = count_errors(alice_words, bob_key.words)
     print(f"\n[Bob] Starting Cascade error correction ({algorithm})...")
     print(f"[Bob] Initial errors: {initial_errors:,} ({initial_errors/len(bob_key_bits)*100:.2f}%)")
     
@@ -121,14 +126,16 @@ def run_bob_client(server_address='localhost:50051',
         estimated_bit_error_rate=qber
     )
     
-    # Start reconciliation
-    reconciled_key = reconciliation.reconcile()
+    # Start reconciliation. Cascade is the only step that talks to Alice, so the
+    # connection is closed as soon as it ends (also on error).
+    with channel:
+        reconciled_key = reconciliation.reconcile()
     
     # 6. Results
     stats = reconciliation.stats
     leaked_bits = channel.bits_leaked
     corrected_bob = reconciled_key.bits
-    final_errors = np.sum(alice_key_bits != corrected_bob)
+    final_errors = count_errors(alice_words, reconciled_key.words)
     
     print(f"\n{'='*70}")
     print(f"  CASCADE RESULTS")
@@ -142,37 +149,27 @@ def run_bob_client(server_address='localhost:50051',
     if final_errors > 0:
         print(f"\n[Bob] WARNING: {final_errors:,} errors remain after Cascade")
         print("[Bob] Cannot proceed to Privacy Amplification")
-        channel.close()
         return
     
     # 7. Privacy Amplification
     print(f"\n[Bob] Starting Privacy Amplification...")
     
-    h_qber = binary_entropy(qber_high)
-    n = len(bob_key_bits)
-    safety_margin = 50
-    
-    final_key_length = int(n - leaked_bits - n * h_qber - safety_margin)
-    final_key_length = max(0, final_key_length)
+    final_key_length = secure_key_length(len(bob_key_bits), qber_high, leaked_bits)
     
     print(f"[Bob] Final key length: {final_key_length:,} bits")
     
     if final_key_length == 0:
         print("[Bob] ABORT: No secure key can be extracted")
-        channel.close()
         return
     
     # Bob performs hashing (open-source PA)
     output_bytes = max(1, (final_key_length + 7) // 8)
-    bob_hash = HashingAlgorithm(''.join(str(int(bit)) for bit in corrected_bob))
+    bob_hash = HashingAlgorithm(bits_to_str(corrected_bob))
     bob_bits = bob_hash.shake_256(output_bytes)[:final_key_length]
-    bob_secure_key = np.fromiter((int(bit) for bit in bob_bits), dtype=np.uint8, count=final_key_length)
+    bob_secure_key = str_to_bits(bob_bits)
     
     print(f"[Bob] Generated final secure key of {len(bob_secure_key):,} bits")
     
-    # 8. Close connection
-    channel.close()
-    
     print(f"\n{'='*70}")
     print(f"  SUCCESS! QKD PROTOCOL COMPLETED")
     print(f"{'='*70}")
@@ -196,6 +193,8 @@ if __name__ == "__main__":
                        help='Cascade algorithm')
     parser.add_argument('--chunk-size', type=int, default=1_000_000,
                        help='CSV chunk size')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Processes used to parse and sift the CSV (default: CPU count)')
     
     args = parser.parse_args()
     
@@ -203,5 +202,6 @@ if __name__ == "__main__":
         server_address=args.server,
         data_file=args.data,
         algorithm=args.algorithm,
-        chunk_size=args.chunk_size
+        chunk_size=args.chunk_size,
+        workers=args.workers
     )
\ No newline at end of file
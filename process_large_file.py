@@ -1,14 +1,15 @@
 import argparse
-import pandas as pd
 import numpy as np
 import time
 from datetime import datetime
 
 
-from qkd.sifting import sifting
+from qkd.sifting import sift_csv_chunks
 from qkd.parameter_estimation import parameter_estimation
 from qkd.cascade_wrapper import cascade_opensource
-from qkd.privacy_amplification_open_source import HashingAlgorithm, binary_entropy
+from qkd.privacy_amplification_open_source import HashingAlgorithm
+from qkd.privacy_amplification import secure_key_length
+from qkd.bits import bits_to_str, str_to_bits
 
 # Configuration
 QBER_THRESHOLD = 0.11
@@ -16,13 +17,14 @@ CHUNK_SIZE = 2_000_000  # Modified by GUI
 CASCADE_ALGORITHM = 'yanetal'  # Modified by GUI
 
 
-def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORITHM):
+def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORITHM, workers=None):
 
     """
     Process a large QKD file in chunks (streaming).
     
     Args:
         filepath: Path to the CSV file 
+        workers: Processes parsing and sifting upcoming chunks (None = CPU count)
     
     Strategy:
         1. Read the file in chunks
@@ -40,7 +42,6 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
     print(f"Algorithm: {algorithm}")
     print("="*70)
 
-    raw_buffer = pd.DataFrame()
     batch_number = 0
     
 
@@ -54,25 +55,21 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
     # Read the file in chunks
     print("\nProcessing chunks...")
 
-    for chunk_num, chunk in enumerate(pd.read_csv(filepath, chunksize=chunk_size), start=1):
+    # Each chunk is one batch. Chunks are parsed and sifted in worker processes
+    # while the previous batch goes through PE, Cascade and PA here.
+    chunks = sift_csv_chunks(filepath, chunk_size, workers)
+    for chunk_num, (alice_bits, bob_bits, raw_rows) in enumerate(chunks, start=1):
         
-        chunk_size = len(chunk)
-        total_raw_bits += chunk_size
+        total_raw_bits += raw_rows
 
-        print(f"\nChunk {chunk_num}: {chunk_size:,} rows (total: {total_raw_bits:,})")
-        
-        
-        raw_buffer = pd.concat([raw_buffer, chunk])
+        print(f"\nChunk {chunk_num}: {raw_rows:,} rows (total: {total_raw_bits:,})")
 
         batch_number += 1
         print(f"\n--- Processing batch {batch_number} ---")
 
-        # Sifting
-        alice_bits, bob_bits = sifting(raw_buffer)
-
         total_sifted_bits += len(alice_bits)
             
-        print(f" Sifted: {len(alice_bits):,} bits (buffer: {len(raw_buffer):,})")
+        print(f" Sifted: {len(alice_bits):,} bits (chunk: {raw_rows:,})")
 
         # Parameter Estimation
         qber, qber_low, qber_high, alice_key, bob_key = parameter_estimation(
@@ -83,7 +80,6 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
             
         if qber_high > QBER_THRESHOLD:
             print(" ABORT batch: QBER too high")
-            raw_buffer = pd.DataFrame()
             continue
 
         # Cascade Error Correction
@@ -100,23 +96,18 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
             print(" WARNING: Errors remain after Cascade!")
             
         # Privacy Amplification
-        h_qber = binary_entropy(qber_high)
-        n = len(alice_key)
-        safety_margin = 50
-
-        final_len = int(n - leaked_bits - n * h_qber - safety_margin)
-        final_len = max(0, final_len)
+        final_len = secure_key_length(len(alice_key), qber_high, leaked_bits)
 
         if final_len > 0 and final_errors == 0:
             output_bytes = max(1, (final_len + 7) // 8)
 
-            alice_hash = HashingAlgorithm(''.join(str(int(bit)) for bit in alice_key))
+            alice_hash = HashingAlgorithm(bits_to_str(alice_key))
             alice_bits = alice_hash.shake_256(output_bytes)[:final_len]
-            alice_sec = np.fromiter((int(bit) for bit in alice_bits), dtype=np.uint8, count=final_len)
+            alice_sec = str_to_bits(alice_bits)
 
-            bob_hash = HashingAlgorithm(''.join(str(int(bit)) for bit in corrected_bob_key))
+            bob_hash = HashingAlgorithm(bits_to_str(corrected_bob_key))
             bob_bits = bob_hash.shake_256(output_bytes)[:final_len]
-            bob_sec = np.fromiter((int(bit) for bit in bob_bits), dtype=np.uint8, count=final_len)
+            bob_sec = str_to_bits(bob_bits)
 
             if np.array_equal(alice_sec, bob_sec):
                 total_final_keys += final_len
@@ -124,10 +115,6 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
             else:
                 print(" PA failed: keys differ")
 
-            
-        # Clear buffer for next batch
-        raw_buffer = pd.DataFrame()
-
     elapsed_time = time.time() - start_time
 
 
@@ -164,6 +151,12 @@ if __name__ == "__main__":
         default=CHUNK_SIZE,
         help="Chunk size in number of rows"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes used to parse and sift the CSV (default: CPU count)"
+    )
 
     args = parser.parse_args()
 
@@ -176,4 +169,4 @@ if __name__ == "__main__":
     print(f"Selected chunk size: {args.chunk:,}")
     print()
     
-    process_large_file(args.data, chunk_size=args.chunk, algorithm=args.algo)
+    process_large_file(args.data, chunk_size=args.chunk, algorithm=args.algo, workers=args.workers)
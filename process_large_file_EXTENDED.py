@@ -4,17 +4,17 @@ Supports both Toeplitz and SHA-256 based PA methods
 """
 
 import argparse
-import pandas as pd
 import numpy as np
 import time
 from datetime import datetime
 
 
-from qkd.sifting import sifting
+from qkd.sifting import sift_csv_chunks
 from qkd.parameter_estimation import parameter_estimation
 from qkd.cascade_wrapper import cascade_opensource
-from qkd.privacy_amplification import toeplitz_hash, binary_entropy as binary_entropy_toeplitz
-from qkd.privacy_amplification_open_source import HashingAlgorithm, binary_entropy
+from qkd.privacy_amplification import toeplitz_hash, secure_key_length
+from qkd.privacy_amplification_open_source import HashingAlgorithm
+from qkd.bits import bits_to_str, str_to_bits
 
 # Configuration
 QBER_THRESHOLD = 0.11
@@ -25,7 +25,7 @@ PE_SAMPLE_RATIO = 0.1  # 10% default
 
 
 def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORITHM,
-                       pa_method=PA_METHOD, pe_sample=PE_SAMPLE_RATIO):
+                       pa_method=PA_METHOD, pe_sample=PE_SAMPLE_RATIO, workers=None):
     """
     Process a large QKD file with configurable parameters.
     
@@ -35,6 +35,7 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
         algorithm: Cascade algorithm to use
         pa_method: Privacy amplification method ('sha256' or 'toeplitz')
         pe_sample: Parameter estimation sample ratio (0.05 to 0.20)
+        workers: Processes parsing and sifting upcoming chunks (None = CPU count)
     """
 
     print("="*70)
@@ -61,17 +62,17 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
     # Read the file in chunks
     print("\nProcessing chunks...")
 
-    for chunk_num, chunk in enumerate(pd.read_csv(filepath, chunksize=chunk_size), start=1):
+    # Chunks are parsed and sifted in worker processes while the previous batch
+    # goes through PE, Cascade and PA here
+    chunks = sift_csv_chunks(filepath, chunk_size, workers)
+    for chunk_num, (alice_bits, bob_bits, actual_chunk_size) in enumerate(chunks, start=1):
         
-        actual_chunk_size = len(chunk)
         total_raw_bits += actual_chunk_size
 
         print(f"\nChunk {chunk_num}: {actual_chunk_size:,} rows")
         
         batch_number += 1
 
-        # Sifting
-        alice_bits, bob_bits = sifting(chunk)
         total_sifted_bits += len(alice_bits)
             
         print(f"  Sifted: {len(alice_bits):,} bits")
@@ -81,9 +82,9 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
             continue
 
         # Parameter Estimation with configurable sample ratio
-        np.random.seed(42)
+        rng = np.random.default_rng(42)
         qber, qber_low, qber_high, alice_key, bob_key = parameter_estimation(
-            alice_bits, bob_bits, sample_ratio=pe_sample
+            alice_bits, bob_bits, sample_ratio=pe_sample, rng=rng
         )
         
         qber_values.append(qber)
@@ -109,34 +110,28 @@ def process_large_file(filepath, chunk_size=CHUNK_SIZE, algorithm=CASCADE_ALGORI
             continue
             
         # Privacy Amplification - METHOD SELECTION
-        h_qber = binary_entropy(qber_high)
-        n = len(alice_key)
-        safety_margin = 50
-
-        final_len = int(n - leaked_bits - n * h_qber - safety_margin)
-        final_len = max(0, final_len)
+        final_len = secure_key_length(len(alice_key), qber_high, leaked_bits)
 
         if final_len > 0:
             if pa_method == 'toeplitz':
                 # Toeplitz Hashing (slower, theoretical)
                 print(f"  PA: Using Toeplitz Matrix...")
-                alice_sec, toeplitz_seed = toeplitz_hash(alice_key, final_len)
-                bob_sec, _ = toeplitz_hash(corrected_bob_key, final_len, seed=toeplitz_seed)
+                alice_sec, toeplitz_seed, seed_fft = toeplitz_hash(alice_key, final_len, rng=rng)
+                bob_sec, _, _ = toeplitz_hash(corrected_bob_key, final_len, seed=toeplitz_seed,
+                                              seed_fft=seed_fft)
                 
             else:  # sha256 (default)
                 # SHA-256 based hashing (faster, practical)
                 print(f"  PA: Using SHA-256...")
                 output_bytes = max(1, (final_len + 7) // 8)
 
-                alice_hash = HashingAlgorithm(''.join(str(int(bit)) for bit in alice_key))
+                alice_hash = HashingAlgorithm(bits_to_str(alice_key))
                 alice_bits_pa = alice_hash.shake_256(output_bytes)[:final_len]
-                alice_sec = np.fromiter((int(bit) for bit in alice_bits_pa), 
-                                       dtype=np.uint8, count=final_len)
+                alice_sec = str_to_bits(alice_bits_pa)
 
-                bob_hash = HashingAlgorithm(''.join(str(int(bit)) for bit in corrected_bob_key))
+                bob_hash = HashingAlgorithm(bits_to_str(corrected_bob_key))
                 bob_bits_pa = bob_hash.shake_256(output_bytes)[:final_len]
-                bob_sec = np.fromiter((int(bit) for bit in bob_bits_pa), 
-                                     dtype=np.uint8, count=final_len)
+                bob_sec = str_to_bits(bob_bits_pa)
 
             # Verify keys match
             if np.array_equal(alice_sec, bob_sec):
@@ -199,6 +194,12 @@ if __name__ == "__main__":
         default=PE_SAMPLE_RATIO,
         help="Parameter Estimation sample ratio (0.05 to 0.20)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes used to parse and sift the CSV (default: CPU count)"
+    )
 
     args = parser.parse_args()
 
@@ -215,5 +216,6 @@ if __name__ == "__main__":
         chunk_size=args.chunk, 
         algorithm=args.algo,
         pa_method=args.pa_method,
-        pe_sample=args.pe_sample
+        pe_sample=args.pe_sample,
+        workers=args.workers
     )
\ No newline at end of file
@@ -35,7 +35,8 @@ def profile_qkd_processing():
     
     # Run with profiling
     profiler.enable()
-    process_large_file(data_file, chunk_size=chunk_size, algorithm=algorithm)
+    # Parse and sift in this process: cProfile does not see worker processes
+    process_large_file(data_file, chunk_size=chunk_size, algorithm=algorithm, workers=1)
     profiler.disable()
     
     print("\n" + "="*70)
@@ -0,0 +1,99 @@
+"""
+Bit-packing helpers.
+Keys travel through the pipeline as numpy arrays holding one bit per byte (uint8).
+These helpers pack them into uint64 words so comparisons and parities run 64 bits
+at a time instead of one byte at a time.
+"""
+
+import numpy as np
+
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+def pack_bits(bits):
+    """
+    Pack an array of 0s and 1s into little-endian uint64 words.
+
+    Args:
+        bits: numpy array of 0s and 1s
+
+    Returns:
+        numpy array of uint64 words. Bit i of the key is bit (i % 64) of word i // 64;
+        padding bits of the last word are 0.
+    """
+    packed = np.packbits(np.asarray(bits, dtype=np.uint8), bitorder='little')
+    padding = -len(packed) % 8
+    if padding:
+        packed = np.concatenate((packed, np.zeros(padding, dtype=np.uint8)))
+    return packed.view('<u8')
+
+
+def unpack_bits(words, size):
+    """
+    Inverse of pack_bits.
+
+    Args:
+        words: numpy array of uint64 words
+        size (int): Number of bits to unpack
+
+    Returns:
+        numpy array of uint8 (0s and 1s) of length size
+    """
+    return np.unpackbits(words.view(np.uint8), count=size, bitorder='little')
+
+
+def _popcount_swar(words):
+    # Branchless SWAR popcount, used when numpy < 2.0 has no bitwise_count
+    x = words - ((words >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return (x * _H01) >> np.uint64(56)
+
+
+if hasattr(np, 'bitwise_count'):
+    popcount = np.bitwise_count
+else:
+    popcount = _popcount_swar
+
+
+def count_errors(a_words, b_words):
+    """
+    Count the positions where two packed keys differ.
+
+    Args:
+        a_words, b_words: packed keys (see pack_bits) of the same length
+
+    Returns:
+        int: Hamming distance between the two keys
+    """
+    return int(popcount(a_words ^ b_words).sum(dtype=np.int64))
+
+
+def bits_to_str(bits):
+    """
+    Convert an array of 0s and 1s into a '0'/'1' string (as expected by HashingAlgorithm).
+
+    Args:
+        bits: numpy array of 0s and 1s
+
+    Returns:
+        str of length len(bits)
+    """
+    return (np.asarray(bits, dtype=np.uint8) + ord('0')).tobytes().decode('ascii')
+
+
+def str_to_bits(bit_string):
+    """
+    Inverse of bits_to_str.
+
+    Args:
+        bit_string (str): string of '0' and '1' characters
+
+    Returns:
+        numpy array of uint8 (0s and 1s)
+    """
+    return np.frombuffer(bit_string.encode('ascii'), dtype=np.uint8) - ord('0')
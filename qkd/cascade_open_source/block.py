@@ -10,7 +10,11 @@ class Block:
     ERRORS_UNKNOWN = None
     """We don't know whether the block contains an even or an odd number of errors."""
 
-    def __init__(self, key, shuffle, start_index, end_index, parent_block):
+    # Cascade creates tens of thousands of blocks per run: no per-instance __dict__.
+    __slots__ = ('_key', '_shuffle', '_start_index', '_end_index', '_parent_block',
+                 '_left_sub_block', '_right_sub_block', '_current_parity', '_correct_parity')
+
+    def __init__(self, key, shuffle, start_index, end_index, parent_block, current_parity=None):
         """
         Create a block, which is a contiguous subset of bits in a shuffled key.
 
@@ -24,6 +28,8 @@ class Block:
                 end_index > start_index.
             parent_block (Block): The parent block. None if there is no parent, i.e. if this is a
                 top-level block.
+            current_parity (None or int): The current parity of the block, if the caller already
+                computed it. If None, it is calculated from the key.
         """
 
         # Store block attributes.
@@ -39,8 +45,10 @@ class Block:
         self._left_sub_block = None
         self._right_sub_block = None
 
-        # Calculate the current parity for this block.
-        self._current_parity = shuffle.calculate_parity(key, start_index, end_index)
+        # Calculate the current parity for this block (unless the caller already did).
+        if current_parity is None:
+            current_parity = shuffle.calculate_parity(key, start_index, end_index)
+        self._current_parity = current_parity
 
         # We don't yet know the correct parity for this block.
         self._correct_parity = None
@@ -61,14 +69,17 @@ class Block:
             A list of blocks that cover the shuffled key.
         """
 
+        # Calculate the current parities of all blocks in one pass over the shuffled key.
+        parities = shuffle.calculate_block_parities(key, block_size)
+
         # Generate the blocks.
         blocks = []
         remaining_bits = shuffle.get_size()
         start_index = 0
-        while remaining_bits > 0:
+        for parity in parities:
             actual_block_size = min(block_size, remaining_bits)
             end_index = start_index + actual_block_size
-            block = Block(key, shuffle, start_index, end_index, None)
+            block = Block(key, shuffle, start_index, end_index, None, parity)
             blocks.append(block)
             start_index += actual_block_size
             remaining_bits -= actual_block_size
@@ -158,11 +169,7 @@ class Block:
             The key indexes for this block (the ordering of the list is undefined; in particular
             don't assume that the key indexes are in increasing order.)
         """
-        key_indexes = []
-        for shuffle_index in range(self._start_index, self._end_index):
-            key_index = self._shuffle.get_key_index(shuffle_index)
-            key_indexes.append(key_index)
-        return key_indexes
+        return self._shuffle.get_key_indexes(self._start_index, self._end_index)
 
     def get_current_parity(self):
         """
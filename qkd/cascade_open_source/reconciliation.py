@@ -1,3 +1,4 @@
+import collections
 import copy
 import heapq
 import math
@@ -33,7 +34,7 @@ class Reconciliation:
         self._reconciled_key = None
 
         # Map key indexes to blocks.
-        self._key_index_to_blocks = {}
+        self._key_index_to_blocks = collections.defaultdict(list)
 
         # Keep track of statistics.
         self.stats = Stats()
@@ -114,11 +115,9 @@ class Reconciliation:
     def _register_block_key_indexes(self, block):
         # For every key bit covered by the block, append the block to the list of blocks that depend
         # on that partical key bit.
+        key_index_to_blocks = self._key_index_to_blocks
         for key_index in block.get_key_indexes():
-            if key_index in self._key_index_to_blocks:
-                self._key_index_to_blocks[key_index].append(block)
-            else:
-                self._key_index_to_blocks[key_index] = [block]
+            key_index_to_blocks[key_index].append(block)
 
     def _get_blocks_containing_key_index(self, key_index):
         return self._key_index_to_blocks.get(key_index, [])
@@ -172,13 +171,9 @@ class Reconciliation:
 
     @staticmethod
     def _bits_in_int(int_value):
-        bits = 0
-        while int_value != 0:
-            bits += 1
-            int_value //= 2
-        if bits == 0:
-            bits = 1
-        return bits
+        # Shuffle identifiers are ~77-bit integers, so use bit_length() rather than a
+        # divide-by-two loop.
+        return max(1, int_value.bit_length())
 
     @staticmethod
     def _bits_in_block_ask_parity(block):
@@ -316,7 +311,7 @@ class Reconciliation:
         # If we are not cascading during BICONF, clear the key indexes to blocks map to avoid
         # wasting time keeping it up to date as correct blocks during the BICONF phase.
         if not self._algorithm.biconf_cascade:
-            self._key_index_to_blocks = {}
+            self._key_index_to_blocks = collections.defaultdict(list)
 
         # Do the required number of BICONF iterations, as determined by the protocol.
         iterations_to_go = self._algorithm.biconf_iterations
@@ -360,44 +355,54 @@ class Reconciliation:
 
     def _try_correct(self, block, correct_right_sibling, cascade):
 
-        # If we don't know the correct parity of the block, we cannot make progress on this block
-        # until Alice has told us what the correct parity is.
-        if not self._correct_parity_is_known_or_can_be_inferred(block):
-            self._schedule_ask_correct_parity(block, correct_right_sibling)
-            return 0
-
-        # If there is an even number of errors in this block, we don't attempt to fix any errors
-        # in this block. But if asked to do so, we will attempt to fix an error in the right
-        # sibling block.
-        if block.get_error_parity() == Block.ERRORS_EVEN:
-            if correct_right_sibling:
-                return self._try_correct_right_sibling_block(block, cascade)
-            return 0
-
-        # If this block contains a single bit, we have finished the recursion and found an error.
-        # Correct the error by flipping the key bit that corresponds to this block.
-        if block.get_size() == 1:
-            self._flip_key_bit_corresponding_to_single_bit_block(block, cascade)
-            return 1
-
-        # If we get here, it means that there is an odd number of errors in this block and that
-        # the block is bigger than 1 bit.
-
-        # Recurse to try to correct an error in the left sub-block first, and if there is no error
-        # there, in the right sub-block alternatively.
+        # Binary search for an error, one level of the block tree per loop iteration (rather than
+        # one recursive call per level).
+        while True:
+
+            # If we don't know the correct parity of the block, we cannot make progress on this
+            # block until Alice has told us what the correct parity is.
+            if not self._correct_parity_is_known_or_can_be_inferred(block):
+                self._schedule_ask_correct_parity(block, correct_right_sibling)
+                return 0
+
+            # If there is an even number of errors in this block, we don't attempt to fix any
+            # errors in this block. But if asked to do so, we will attempt to fix an error in the
+            # right sibling block.
+            if block.get_error_parity() == Block.ERRORS_EVEN:
+                if correct_right_sibling:
+                    block = self._get_right_sibling_block(block)
+                    correct_right_sibling = False
+                    continue
+                return 0
+
+            # If this block contains a single bit, we have finished the search and found an error.
+            # Correct the error by flipping the key bit that corresponds to this block.
+            if block.get_size() == 1:
+                self._flip_key_bit_corresponding_to_single_bit_block(block, cascade)
+                return 1
+
+            # If we get here, it means that there is an odd number of errors in this block and that
+            # the block is bigger than 1 bit.
+
+            # Try to correct an error in the left sub-block first, and if there is no error there,
+            # in the right sub-block alternatively.
+            block = self._get_left_sub_block(block)
+            correct_right_sibling = True
+
+    def _get_left_sub_block(self, block):
         left_sub_block = block.get_left_sub_block()
-        if  left_sub_block is None:
+        if left_sub_block is None:
             left_sub_block = block.create_left_sub_block()
             self._register_block_key_indexes(left_sub_block)
-        return self._try_correct(left_sub_block, True, cascade)
+        return left_sub_block
 
-    def _try_correct_right_sibling_block(self, block, cascade):
+    def _get_right_sibling_block(self, block):
         parent_block = block.get_parent_block()
         right_sibling_block = parent_block.get_right_sub_block()
         if right_sibling_block is None:
             right_sibling_block = parent_block.create_right_sub_block()
             self._register_block_key_indexes(right_sibling_block)
-        return self._try_correct(right_sibling_block, False, cascade)
+        return right_sibling_block
 
     def _flip_key_bit_corresponding_to_single_bit_block(self, block, cascade):
 
@@ -1,5 +1,7 @@
 import random
 
+import numpy as np
+
 class Shuffle:
     """
     A shuffling (i.e. re-ordering) of the bits in a key.
@@ -16,6 +18,9 @@ class Shuffle:
     _MAX_ALGORITHM = 100
     _MAX_SHUFFLE_SEED = 1_000_000_000_000
 
+    # Below this many bits a plain Python loop beats the numpy gather in calculate_parity.
+    _VECTORIZED_PARITY_MIN_BITS = 16
+
     def __init__(self, size, algorithm, shuffle_seed=None):
         """
         Create a shuffle. A shuffle represents a permutation of the bits in a key. The shuffle
@@ -31,21 +36,23 @@ class Shuffle:
                 SHUFFLE_KEEP_SAME: Do not shuffle the key (keep the key bits in the original order).
                 SHUFFLE_RANDOM: Randomly shuffle the key.
             shuffle_seed (None or int): The seed value for the isolated shuffle random number
-                generator that is used to generate the shuffling permutation. If shuffle_seed is
-                None, then a random shuffle_seed value will be generated.
+                generator (a numpy PCG64 generator) that is used to generate the shuffling
+                permutation. If shuffle_seed is None, then a random shuffle_seed value will be
+                generated.
         """
         self._size = size
-        self._shuffle_index_to_key_index = {}
-        for shuffle_index in range(0, size):
-            self._shuffle_index_to_key_index[shuffle_index] = shuffle_index
+        self._algorithm = algorithm
         if algorithm == self.SHUFFLE_RANDOM:
             if shuffle_seed is None:
                 shuffle_seed = \
                     Shuffle._shuffle_seed_random_generator.randint(1, Shuffle._MAX_SHUFFLE_SEED - 1)
-            shuffle_random_generator = random.Random(shuffle_seed)
-            shuffle_random_generator.shuffle(self._shuffle_index_to_key_index)
+            shuffle_random_generator = np.random.default_rng(shuffle_seed)
+            self._permutation = shuffle_random_generator.permutation(size)
         else:
             shuffle_seed = 0
+            self._permutation = np.arange(size, dtype=np.int64)
+        # Python ints for the per-bit accessors, which index one bit at a time.
+        self._shuffle_index_to_key_index = self._permutation.tolist()
         self._identifier = Shuffle._encode_identifier(size, algorithm, shuffle_seed)
 
     @staticmethod
@@ -65,6 +72,19 @@ class Shuffle:
         shuffle = Shuffle(size, algorithm, shuffle_seed)
         return shuffle
 
+    @staticmethod
+    def get_algorithm_from_identifier(identifier):
+        """
+        Get the shuffle algorithm encoded in a shuffle identifier, without creating the shuffle.
+
+        Args:
+            identifier (int): The shuffle identifier.
+
+        Returns:
+            The shuffle algorithm (SHUFFLE_KEEP_SAME or SHUFFLE_RANDOM).
+        """
+        return Shuffle._decode_identifier(identifier)[1]
+
     @staticmethod
     def _encode_identifier(size, algorithm, shuffle_seed):
         identifier = shuffle_seed
@@ -147,6 +167,18 @@ class Shuffle:
         """
         return self._identifier
 
+    def get_permutation(self):
+        """
+        Get the whole shuffle as an array.
+
+        The array is shared with the shuffle; callers must not modify it.
+
+        Returns:
+            A numpy int64 array whose element at shuffle index i is the key index that i is
+            mapped to.
+        """
+        return self._permutation
+
     def get_key_index(self, shuffle_index):
         """
         Get the key index that a given shuffle index is mapped to.
@@ -160,6 +192,21 @@ class Shuffle:
         """
         return self._shuffle_index_to_key_index[shuffle_index]
 
+    def get_key_indexes(self, shuffle_start_index, shuffle_end_index):
+        """
+        Get the key indexes that a contiguous range of shuffle indexes is mapped to.
+
+        Args:
+            shuffle_start_index (int): The first shuffle index (inclusive) of the range.
+            shuffle_end_index (int): The last shuffle index (exclusive) of the range.
+
+        Returns:
+            A list of key indexes, in shuffle index order.
+        """
+        if self._algorithm == self.SHUFFLE_KEEP_SAME:
+            return list(range(shuffle_start_index, shuffle_end_index))
+        return self.get_permutation()[shuffle_start_index:shuffle_end_index].tolist()
+
     def get_bit(self, key, shuffle_index):
         """
         Get a bit from a shuffled key.
@@ -220,9 +267,37 @@ class Shuffle:
         Returns:
             The parity of the contiguous sub-range of bits in the shuffled key.
         """
+        if self._algorithm == self.SHUFFLE_KEEP_SAME:
+            # Shuffle and key indexes coincide: the range is contiguous in the key too.
+            return key.range_parity(shuffle_start_index, shuffle_end_index)
+        if shuffle_end_index - shuffle_start_index >= self._VECTORIZED_PARITY_MIN_BITS:
+            key_indexes = self.get_permutation()[shuffle_start_index:shuffle_end_index]
+            return key.indexes_parity(key_indexes)
         parity = 0
         for shuffle_index in range(shuffle_start_index, shuffle_end_index):
             key_index = self._shuffle_index_to_key_index[shuffle_index]
             if key.get_bit(key_index):
                 parity = 1 - parity
         return parity
+
+    def calculate_block_parities(self, key, block_size):
+        """
+        Calculate the parities of consecutive blocks of a shuffled key in one pass.
+
+        Args:
+            key (Key): The key for which to calculate the parities after shuffling it.
+            block_size (int): The size of each block. The blocks start at shuffle index 0 and
+                each one, except for the last one, is exactly this size.
+
+        Returns:
+            A list with the parity (0 or 1) of each block, in shuffle order.
+        """
+        if self._size == 0:
+            return []
+        block_starts = np.arange(0, self._size, block_size)
+        if self._algorithm == self.SHUFFLE_KEEP_SAME:
+            # Blocks are contiguous in the key: range parities straight from the packed words.
+            block_ends = np.append(block_starts[1:], self._size)
+            return key.range_parities(block_starts, block_ends).tolist()
+        shuffled_bits = key.get_bits(self.get_permutation())
+        return np.bitwise_xor.reduceat(shuffled_bits, block_starts).tolist()
@@ -3,31 +3,154 @@ Wrapper to use open-source Cascade with numpy arrays.
 This file bridges your numpy-based code and the open-source code (Key classes).
 """
 
+import functools
+
 import numpy as np
+from qkd.bits import pack_bits, unpack_bits, count_errors, popcount
 from qkd.cascade_open_source import Reconciliation
 
 
+# Cascade asks about the same few shuffles (one per iteration) thousands of times,
+# so each shuffle's prefix parities are built once. 32 covers every iteration of the
+# longest algorithm. A ParityPrefix takes about 9/64 bytes per key bit, so a full
+# cache holds about 4.5 bytes per key bit (450 MB for a 10^8-bit key).
+PARITY_PREFIX_CACHE_SIZE = 32
+
+
 class Key:
-    """Wrapper to convert numpy arrays into a Key object"""
+    """Wrapper to convert numpy arrays into a Key object (bits packed in uint64 words)"""
     
     def __init__(self, bits):
         """
         Args:
             bits: numpy array of 0s and 1s
         """
-        self.bits = bits
+        self._size = len(bits)
+        self._words = pack_bits(bits)
+    
+    @property
+    def bits(self):
+        """The key as a numpy array of 0s and 1s (unpacked copy)"""
+        return unpack_bits(self._words, self._size)
+    
+    @property
+    def words(self):
+        """The packed uint64 words backing the key (see qkd.bits.pack_bits), not a copy"""
+        return self._words
     
     def get_size(self):
-        return len(self.bits)
+        return self._size
     
     def get_bit(self, index):
-        return int(self.bits[index])
+        return (int(self._words[index >> 6]) >> (index & 63)) & 1
     
     def set_bit(self, index, value):
-        self.bits[index] = value
+        word = int(self._words[index >> 6])
+        mask = 1 << (index & 63)
+        self._words[index >> 6] = (word | mask) if value else (word & ~mask)
     
     def flip_bit(self, index):
-        self.bits[index] ^= 1
+        self._words[index >> 6] ^= np.uint64(1 << (index & 63))
+    
+    def get_bits(self, key_indexes):
+        """
+        Bits at the given indexes (numpy integer array), as a numpy uint8 array.
+        Small selections are gathered straight from the packed words; large ones
+        (e.g. a whole permutation) are faster to take from the unpacked key.
+        """
+        if len(key_indexes) * 8 >= self._size:
+            return self.bits[key_indexes]
+        shifted = self._words[key_indexes >> 6] >> (key_indexes & 63).astype(np.uint64)
+        return (shifted & np.uint64(1)).astype(np.uint8)
+    
+    def range_parity(self, start_index, end_index):
+        """
+        Parity of the key bits in [start_index, end_index).
+        Whole words are XOR-folded; the first and last word are masked to the range.
+        """
+        if end_index <= start_index:
+            return 0
+        first_word = start_index >> 6
+        last_word = (end_index - 1) >> 6
+        folded = int(np.bitwise_xor.reduce(self._words[first_word + 1:last_word], initial=0))
+        head = int(self._words[first_word]) >> (start_index & 63)
+        if first_word == last_word:
+            head &= (1 << (end_index - start_index)) - 1
+        else:
+            tail_bits = end_index - (last_word << 6)
+            folded ^= int(self._words[last_word]) & ((1 << tail_bits) - 1)
+        return bin(folded ^ head).count('1') & 1
+
+    def range_parities(self, starts, ends):
+        """
+        Parities of the key ranges [start, end) (numpy integer arrays), as a numpy uint8 array.
+        The key changes between calls, so a ParityPrefix of its current words is built each time.
+        """
+        return ParityPrefix(self._words).range_parities(starts, ends)
+    
+    def indexes_parity(self, key_indexes):
+        """
+        Parity of the key bits at the given indexes (numpy integer array).
+        Gathers the bits in one call instead of one get_bit call per index.
+        """
+        return np.count_nonzero(self.get_bits(key_indexes)) & 1
+
+
+class ParityPrefix:
+    """
+    Prefix parities of a bit string, kept packed.
+
+    Stores the bits as uint64 words (see qkd.bits.pack_bits) plus the running parity
+    before each word, about 9/64 bytes per bit instead of one byte per bit for an
+    unpacked prefix array. The parity of the first b bits is the parity before word
+    b // 64 XOR the popcount parity of that word's low b % 64 bits.
+    """
+    
+    def __init__(self, words):
+        """
+        Args:
+            words: packed bits (see qkd.bits.pack_bits), padding bits 0
+        """
+        self.words = words  # not copied
+        word_parities = (popcount(words) & 1).astype(np.uint8)
+        self._parity_before_word = np.zeros(len(words) + 1, dtype=np.uint8)
+        np.bitwise_xor.accumulate(word_parities, out=self._parity_before_word[1:])
+    
+    def prefix_parities(self, boundaries):
+        """
+        Parities of the prefixes [0, b) for every b in boundaries (numpy integer array).
+        """
+        word_index = boundaries >> 6
+        if not len(self.words):
+            return self._parity_before_word[word_index]
+        masks = (np.uint64(1) << (boundaries & 63).astype(np.uint64)) - np.uint64(1)
+        # A boundary at the very end of a whole last word indexes one word past the end;
+        # its mask is 0, so any word gives the same (zero) head parity
+        head_words = self.words[np.minimum(word_index, len(self.words) - 1)]
+        head_parities = (popcount(head_words & masks) & 1).astype(np.uint8)
+        return self._parity_before_word[word_index] ^ head_parities
+    
+    def range_parities(self, starts, ends):
+        """
+        Parities of the ranges [start, end) (numpy integer arrays), as a numpy uint8 array.
+        """
+        return self.prefix_parities(ends) ^ self.prefix_parities(starts)
+
+
+def shuffled_parity_prefix(key, shuffle):
+    """
+    Prefix parities of a shuffled key.
+
+    Args:
+        key: Key object
+        shuffle: Shuffle to apply to the key
+
+    Returns:
+        ParityPrefix of the shuffled key, so the parities of shuffle ranges
+        [start, end) are prefix.range_parities(starts, ends). Only valid while the
+        key is not modified.
+    """
+    return ParityPrefix(pack_bits(key.get_bits(shuffle.get_permutation())))
 
 
 class SimpleClassicalChannel:
@@ -40,6 +163,10 @@ class SimpleClassicalChannel:
         """
         self.alice_key = alice_key
         self.bits_leaked = 0
+        # Alice's key never changes, so each shuffle's prefix parities stay valid
+        self._get_parity_prefix = functools.lru_cache(maxsize=PARITY_PREFIX_CACHE_SIZE)(
+            functools.partial(shuffled_parity_prefix, alice_key)
+        )
     
     def start_reconciliation(self, algorithm_name):
         """Called at the start of reconciliation"""
@@ -55,17 +182,28 @@ class SimpleClassicalChannel:
         Returns:
             list of parities (0 or 1)
         """
-        parities = []
-        for block in blocks:
-            # Compute the block parity in Alice's key
-            parity = block.get_shuffle().calculate_parity(
-                self.alice_key, 
-                block.get_start_index(), 
-                block.get_end_index()
-            )
-            parities.append(parity)
-            self.bits_leaked += 1  # 1 parity bit revealed
-        return parities
+        shuffles = []
+        shuffle_refs = {}
+        refs = np.empty(len(blocks), dtype=np.int64)
+        starts = np.empty(len(blocks), dtype=np.int64)
+        ends = np.empty(len(blocks), dtype=np.int64)
+        for i, block in enumerate(blocks):
+            shuffle = block.get_shuffle()
+            ref = shuffle_refs.setdefault(shuffle.get_identifier(), len(shuffles))
+            if ref == len(shuffles):
+                shuffles.append(shuffle)
+            refs[i] = ref
+            starts[i] = block.get_start_index()
+            ends[i] = block.get_end_index()
+        
+        # Block parities in Alice's key, from each shuffle's prefix parities
+        parities = np.empty(len(blocks), dtype=np.uint8)
+        for ref, shuffle in enumerate(shuffles):
+            prefix = self._get_parity_prefix(shuffle)
+            selected = refs == ref
+            parities[selected] = prefix.range_parities(starts[selected], ends[selected])
+        self.bits_leaked += len(parities)  # 1 parity bit revealed per block
+        return parities.tolist()
     
     def end_reconciliation(self, algorithm_name):
         """Called at the end of reconciliation"""
@@ -76,6 +214,10 @@ def cascade_opensource(alice_bits, bob_bits, qber, algorithm, verbose=False):
     """
     Use open-source Cascade to correct errors.
     
+    alice_bits and bob_bits are only read, never modified, so callers running
+    several algorithms on the same keys can pass them as they are, without copies.
+    The corrected key is returned as a new array.
+    
     Args:
         alice_bits (np.array): Alice's key (numpy array of uint8)
         bob_bits (np.array): Bob's key with errors (numpy array of uint8)
@@ -93,9 +235,10 @@ def cascade_opensource(alice_bits, bob_bits, qber, algorithm, verbose=False):
         final_errors (int): Residual errors
         stats (Stats): Detailed statistics
     """
-    # Convert numpy arrays to Key objects
-    alice_key = Key(alice_bits.copy())
-    bob_key = Key(bob_bits.copy())
+    # Convert numpy arrays to Key objects (Key packs the bits into its own words,
+    # so the caller's arrays are never aliased)
+    alice_key = Key(alice_bits)
+    bob_key = Key(bob_bits)
     
     # Create the communication channel
     channel = SimpleClassicalChannel(alice_key)
@@ -110,7 +253,7 @@ def cascade_opensource(alice_bits, bob_bits, qber, algorithm, verbose=False):
     
     if verbose:
         print(f"\n=== Cascade Open-Source ({algorithm}) ===")
-        print(f"Initial errors: {np.sum(alice_bits != bob_bits)}")
+        print(f"Initial errors: {count_errors(alice_key.words, bob_key.words)}")
         print(f"Estimated QBER: {qber*100:.3f}%")
     
     # Run Cascade
@@ -123,8 +266,8 @@ def cascade_opensource(alice_bits, bob_bits, qber, algorithm, verbose=False):
     # Convert reconciled key to numpy array
     corrected_bob = reconciled_key.bits
     
-    # Compute residual errors
-    final_errors = np.sum(alice_bits != corrected_bob)
+    # Compute residual errors on the packed words (Alice's key is never modified)
+    final_errors = count_errors(alice_key.words, reconciled_key.words)
     
     if verbose:
         print(f"\nResults:")
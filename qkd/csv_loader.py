@@ -0,0 +1,193 @@
+"""
+Chunked CSV loading for raw QKD data.
+Yields the columns needed for sifting chunk_size rows at a time. Uses pyarrow's
+streaming CSV reader when pyarrow is installed (chunks are pyarrow Tables, sifted
+without leaving Arrow) and falls back to pandas otherwise (chunks are dicts of
+numpy arrays).
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+
+SIFTING_COLUMNS = ('tx_state', 'rx_state', 'matching_basis', 'decoy_level')
+
+_BLOCK_SIZE = 8 << 20  # bytes of CSV text parsed per pyarrow batch
+_SCAN_BLOCK_SIZE = 64 << 20  # bytes read at a time when locating range boundaries
+_NEWLINE = ord('\n')
+
+
+def _column_types():
+    return {
+        'tx_state': pa.uint8(),
+        'rx_state': pa.uint8(),
+        'matching_basis': pa.bool_(),
+        'decoy_level': pa.int8(),
+    }
+
+
+# Same column types for the pandas fallback
+_PANDAS_DTYPES = {
+    'tx_state': 'uint8',
+    'rx_state': 'uint8',
+    'matching_basis': 'bool',
+    'decoy_level': 'int8',
+}
+
+
+def _check_chunk_size(chunk_size):
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be a positive number of rows, got {chunk_size}")
+
+
+def _read_header(csv_file):
+    with open(csv_file, 'r') as f:
+        return f.readline().strip().split(',')
+
+
+def _read_chunks_pyarrow(csv_file, columns, chunk_size):
+    reader = pa_csv.open_csv(
+        csv_file,
+        read_options=pa_csv.ReadOptions(block_size=_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types=_column_types()
+        )
+    )
+
+    # Re-slice pyarrow's byte-sized batches into chunks of exactly chunk_size rows
+    pending = []
+    pending_rows = 0
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+
+        while pending_rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_size)
+            rest = table.slice(chunk_size)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+
+def _read_chunks_pandas(csv_file, columns, chunk_size):
+    # engine='pyarrow' does not support chunksize, so this stays on the C parser, but
+    # usecols/dtype skip the unused columns and the per-chunk type inference
+    dtypes = {name: _PANDAS_DTYPES[name] for name in columns}
+    for chunk in pd.read_csv(csv_file, chunksize=chunk_size, usecols=columns, dtype=dtypes):
+        yield {name: chunk[name].to_numpy() for name in columns}
+
+
+def read_csv_chunks(csv_file, chunk_size=1_000_000):
+    """
+    Read a raw QKD CSV file in chunks.
+
+    Args:
+        csv_file: Path to CSV file
+        chunk_size: Number of rows per chunk, must be positive
+
+    Yields:
+        pyarrow Table (pyarrow installed) or dict mapping column name -> numpy array
+        (pandas fallback), for the columns in SIFTING_COLUMNS present in the file.
+        Both support chunk[name] and can be passed to qkd.sifting.sifting.
+    """
+    _check_chunk_size(chunk_size)
+    header = _read_header(csv_file)
+    columns = [name for name in SIFTING_COLUMNS if name in header]
+
+    if pa is not None:
+        yield from _read_chunks_pyarrow(csv_file, columns, chunk_size)
+    else:
+        yield from _read_chunks_pandas(csv_file, columns, chunk_size)
+
+
+def csv_byte_ranges(csv_file, chunk_size=1_000_000):
+    """
+    Split the data rows of a CSV file into byte ranges of exactly chunk_size rows.
+
+    The file is scanned for newlines as the ranges are consumed, so range N always
+    holds rows [N*chunk_size, (N+1)*chunk_size), the same rows as chunk N of
+    read_csv_chunks. Every range ends on a line boundary and can be parsed on its
+    own with read_csv_range.
+
+    Args:
+        csv_file: Path to CSV file
+        chunk_size: Number of rows per range (the last range may be shorter)
+
+    Yields:
+        (start, end) byte offsets, in file order
+    """
+    _check_chunk_size(chunk_size)
+    file_size = os.path.getsize(csv_file)
+
+    with open(csv_file, 'rb') as f:
+        f.readline()
+        start = offset = f.tell()
+
+        # Rows still needed to complete the current range
+        remaining = chunk_size
+        while True:
+            block = f.read(_SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == _NEWLINE)
+            # Newlines that close a range: the remaining-th one, then every chunk_size-th
+            ends = newlines[remaining - 1::chunk_size] + offset + 1
+            if len(ends):
+                remaining = chunk_size - (len(newlines) - remaining) % chunk_size
+            else:
+                remaining -= len(newlines)
+            offset += len(block)
+            for end in ends.tolist():
+                yield start, end
+                start = end
+
+    # Last rows, fewer than chunk_size (or a final line without a newline)
+    if start < file_size:
+        yield start, file_size
+
+
+def read_csv_range(csv_file, start, end):
+    """
+    Read the rows of a raw QKD CSV file between two byte offsets.
+
+    Args:
+        csv_file: Path to CSV file
+        start, end: Byte range from csv_byte_ranges
+
+    Returns:
+        pyarrow Table or dict of numpy arrays, as yielded by read_csv_chunks
+    """
+    header = _read_header(csv_file)
+    columns = [name for name in SIFTING_COLUMNS if name in header]
+
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    if pa is not None:
+        return pa_csv.read_csv(
+            pa.BufferReader(data),
+            read_options=pa_csv.ReadOptions(column_names=header),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=columns,
+                column_types=_column_types()
+            )
+        )
+
+    dtypes = {name: _PANDAS_DTYPES[name] for name in columns}
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=columns, dtype=dtypes)
+    return {name: chunk[name].to_numpy() for name in columns}
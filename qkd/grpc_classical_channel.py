@@ -4,6 +4,9 @@ Allows Bob to communicate with Alice over the network.
 """
 
 import grpc
+import logging
+import numpy as np
+import queue
 import sys
 import os
 
@@ -21,10 +24,39 @@ except ImportError as e:
     sys.exit(1)
 
 
+log = logging.getLogger(__name__)
+
+# HTTP/2 keepalive and flow control (Alice's server accepts pings this often)
+KEEPALIVE_TIME_MS = 10_000
+KEEPALIVE_TIMEOUT_MS = 5_000
+TCP_USER_TIMEOUT_MS = 20_000      # drop the connection if sent data stays unacknowledged this long
+CLIENT_IDLE_TIMEOUT_MS = 300_000  # release the connection after this long without a call
+HTTP2_LOOKAHEAD_BYTES = 4 * 1024 * 1024   # per-stream flow-control window
+HTTP2_MAX_FRAME_SIZE = 16 * 1024 * 1024 - 1
+
+# Times a parity request is resent on a reopened stream after the stream broke
+STREAM_RETRIES = 1
+
+# Unary parity requests at least this large are gzipped (smaller ones grow under gzip)
+GZIP_MIN_REQUEST_BYTES = 1024
+
+
 class gRPCClassicalChannel:
     """
     Classical communication channel via gRPC.
     Bob uses this channel to request parities from Alice.
+
+    One channel serves any number of reconciliations, with any algorithm: its
+    connection and parity stream stay open between them. Create it once and close
+    it when done, or use it as a context manager.
+
+    A channel is single-threaded: it holds one parity stream and its per-stream and
+    per-reconciliation state without locking. Run concurrent reconciliations on
+    separate gRPCClassicalChannel objects.
+
+    bits_leaked counts the parities revealed in the current (or last) reconciliation
+    and is reset by start_reconciliation; use it for that key's leak, e.g. in
+    secure_key_length. total_bits_leaked accumulates over the channel's lifetime.
     """
     
     def __init__(self, server_address='localhost:50051'):
@@ -33,7 +65,11 @@ class gRPCClassicalChannel:
             server_address (str): Alice server address (e.g. 'localhost:50051')
         """
         self.server_address = server_address
+        # Parities leaked in the current reconciliation, and over all of them
         self.bits_leaked = 0
+        self.total_bits_leaked = 0
+        # Parity requests of the current reconciliation, reported at its end
+        self._reconciliation_requests = 0
         
         # Create connection to Alice server
 
@@ -41,21 +77,109 @@ class gRPCClassicalChannel:
         options = [
             ('grpc.max_send_message_length', 100 * 1024 * 1024),      # 100 MB
             ('grpc.max_receive_message_length', 100 * 1024 * 1024),   # 100 MB
+            ('grpc.keepalive_time_ms', KEEPALIVE_TIME_MS),
+            ('grpc.keepalive_timeout_ms', KEEPALIVE_TIMEOUT_MS),
+            ('grpc.http2.max_pings_without_data', 0),
+            # Keep pinging between reconciliations so a dead Alice is noticed before the next one
+            ('grpc.keepalive_permit_without_calls', 1),
+            ('grpc.tcp_user_timeout_ms', TCP_USER_TIMEOUT_MS),
+            ('grpc.client_idle_timeout_ms', CLIENT_IDLE_TIMEOUT_MS),
+            ('grpc.http2.lookahead_bytes', HTTP2_LOOKAHEAD_BYTES),
+            ('grpc.http2.max_frame_size', HTTP2_MAX_FRAME_SIZE),
         ]
         self.channel = grpc.insecure_channel(server_address, options=options)
         self.stub = qkd_grpc_cascade_pb2_grpc.CascadeServiceStub(self.channel)
+
+        # Parity stream, opened on first use and kept across reconciliations until close()
+        self._parity_requests = None
+        self._parity_responses = None
+        self._stream_supported = True
         
         print(f"[Bob] Connected to Alice at {server_address}")
     
     def start_reconciliation(self, algorithm_name):
         """Signal to Alice the start of reconciliation"""
         request = qkd_grpc_cascade_pb2.StartRequest(algorithm_name=algorithm_name)
+        self.bits_leaked = 0
+        self._reconciliation_requests = 0
         try:
             self.stub.StartReconciliation(request)
             print(f"[Bob] Started reconciliation with {algorithm_name}")
         except grpc.RpcError as e:
             print(f"[Bob] ERROR: Cannot reach Alice - {e}")
             raise
+
+    def _open_parity_stream(self):
+        """Open one bidirectional AskParitiesStream call shared by all reconciliations"""
+        self._parity_requests = queue.Queue()
+        self._parity_responses = self.stub.AskParitiesStream(iter(self._parity_requests.get, None))
+        # Shuffle ID -> index in the stream's shuffle table (each ID is sent once per stream)
+        self._stream_shuffle_indexes = {}
+
+    def _close_parity_stream(self):
+        if self._parity_requests is not None:
+            self._parity_requests.put(None)  # ends the request iterator
+        self._parity_requests = None
+        self._parity_responses = None
+
+    def _unary_request(self, shuffle_ids, refs, starts, ends):
+        # Self-contained request: refs index this request's own shuffle_ids
+        return qkd_grpc_cascade_pb2.ParityRequest(
+            shuffle_ids=[str(shuffle_id) for shuffle_id in shuffle_ids],
+            shuffle_refs=refs,
+            starts=starts,
+            ends=ends
+        )
+
+    def _ask_parities_unary(self, request):
+        # Most Cascade requests are a few dozen blocks, so the parity stream and small
+        # unary calls go uncompressed; only large requests shrink enough under gzip
+        if request.ByteSize() >= GZIP_MIN_REQUEST_BYTES:
+            compression = grpc.Compression.Gzip
+        else:
+            compression = grpc.Compression.NoCompression
+        return self.stub.AskParities(request, compression=compression)
+
+    def _stream_request(self, shuffle_ids, refs, starts, ends):
+        # Only shuffles not yet sent on this stream travel as IDs; Alice appends them to
+        # the stream's table and stream_shuffle_refs index that table
+        new_ids = []
+        table_refs = []
+        for shuffle_id in shuffle_ids:
+            if shuffle_id not in self._stream_shuffle_indexes:
+                self._stream_shuffle_indexes[shuffle_id] = len(self._stream_shuffle_indexes)
+                new_ids.append(str(shuffle_id))
+            table_refs.append(self._stream_shuffle_indexes[shuffle_id])
+        return qkd_grpc_cascade_pb2.ParityRequest(
+            shuffle_ids=new_ids,
+            stream_shuffle_refs=[table_refs[ref] for ref in refs],
+            starts=starts,
+            ends=ends
+        )
+
+    def _send_parity_request(self, *columns):
+        if not self._stream_supported:
+            return self._ask_parities_unary(self._unary_request(*columns))
+        for attempt in range(1 + STREAM_RETRIES):
+            if self._parity_responses is None:
+                self._open_parity_stream()
+            # Built per attempt: a reopened stream starts with an empty shuffle table
+            self._parity_requests.put(self._stream_request(*columns))
+            try:
+                return next(self._parity_responses)
+            except grpc.RpcError as e:
+                self._close_parity_stream()
+                if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                    # Alice does not offer the stream: fall back to unary calls
+                    print("[Bob] AskParitiesStream not supported by Alice, using AskParities")
+                    self._stream_supported = False
+                    return self._ask_parities_unary(self._unary_request(*columns))
+                if attempt == STREAM_RETRIES:
+                    raise
+                # The stream stays open between reconciliations and may have broken while
+                # idle (e.g. Alice restarted). No response came back for this request and
+                # asking again reveals the same parities, so reopen and resend it.
+                print(f"[Bob] Parity stream to Alice broke ({e.code().name}), reopening it")
     
     def ask_parities(self, blocks):
         """
@@ -67,26 +191,30 @@ class gRPCClassicalChannel:
         Returns:
             list: List of parities (0 or 1)
         """
-        # Convert Block objects to protobuf messages
-        block_infos = []
+        # Columnar request: each shuffle ID is listed once, blocks refer to it by index
+        shuffle_refs = {}
+        refs = []
+        starts = []
+        ends = []
         for block in blocks:
-            block_info = qkd_grpc_cascade_pb2.BlockInfo(
-                shuffle_id=str(block.get_shuffle().get_identifier()),
-                start_index=block.get_start_index(),
-                end_index=block.get_end_index()
-            )
-            block_infos.append(block_info)
-        
-        # Create the request
-        request = qkd_grpc_cascade_pb2.ParityRequest(blocks=block_infos)
+            shuffle_id = block.get_shuffle().get_identifier()
+            refs.append(shuffle_refs.setdefault(shuffle_id, len(shuffle_refs)))
+            starts.append(block.get_start_index())
+            ends.append(block.get_end_index())
         
         # Send to Alice and receive response
         try:
-            response = self.stub.AskParities(request)
-            parities = list(response.parities)
+            response = self._send_parity_request(list(shuffle_refs), refs, starts, ends)
+            parities = np.unpackbits(np.frombuffer(response.parities_packed, dtype=np.uint8),
+                                     count=response.count, bitorder='little').tolist()
             
             self.bits_leaked += len(parities)
-            print(f"[Bob] Received {len(parities)} parities from Alice (total leaked: {self.bits_leaked})")
+            self.total_bits_leaked += len(parities)
+            self._reconciliation_requests += 1
+            # Once per Cascade round: keep stdout out of the round trip unless debugging
+            # (lazy %-args, so nothing is formatted when DEBUG is off)
+            log.debug("Received %d parities from Alice (leaked this reconciliation: %d)",
+                      len(parities), self.bits_leaked)
             
             return parities
             
@@ -95,15 +223,24 @@ class gRPCClassicalChannel:
             raise
     
     def end_reconciliation(self, algorithm_name):
-        """Signal to Alice the end of reconciliation"""
+        """Signal to Alice the end of reconciliation (the parity stream stays open)"""
         request = qkd_grpc_cascade_pb2.EndRequest(algorithm_name=algorithm_name)
         try:
             self.stub.EndReconciliation(request)
-            print(f"[Bob] Ended reconciliation")
+            print(f"[Bob] Ended reconciliation: {self.bits_leaked:,} parities "
+                  f"received in {self._reconciliation_requests:,} requests "
+                  f"(total leaked on this channel: {self.total_bits_leaked:,})")
         except grpc.RpcError as e:
             print(f"[Bob] WARNING: Could not notify Alice of end - {e}")
     
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def close(self):
         """Close the connection"""
+        self._close_parity_stream()
         self.channel.close()
         print("[Bob] Closed connection to Alice")
\ No newline at end of file
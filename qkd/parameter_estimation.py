@@ -1,25 +1,33 @@
 import numpy as np
-import math
 
 
 CONFIDENCE_Z = 3 # 99.7% confidence interval
 SAMPLE_RATIO = 0.1 # 10% sample for parameter estimation
+PE_SEED = 42 # Alice and Bob must draw the same PE sample
 
 
 
 def qber_confidence_interval(qber, n, z=CONFIDENCE_Z):
     if n == 0:
         return 0, 0
-    delta = z * math.sqrt((qber * (1 - qber)) / n)
-    return max(0, qber - delta), min(1, qber + delta)
+    delta = z * np.sqrt((qber * (1 - qber)) / n)
+    qber_low, qber_high = np.clip((qber - delta, qber + delta), 0, 1)
+    return float(qber_low), float(qber_high)
 
 
-def parameter_estimation(alice_bits, bob_bits, sample_ratio=SAMPLE_RATIO):
+def parameter_estimation(alice_bits, bob_bits, sample_ratio=SAMPLE_RATIO, rng=None):
+    # rng: np.random.Generator used to draw the sample. Alice and Bob must pass
+    # generators with the same seed so they reveal the same positions.
+
+    if rng is None:
+        rng = np.random.default_rng()
 
     sample_size = int(len(alice_bits) * sample_ratio)
-    sample_idx = np.random.choice(len(alice_bits), sample_size, replace=False)
+    # Order of the sample does not matter (it is only counted and masked out),
+    # so skip the final shuffle of the drawn indexes
+    sample_idx = rng.choice(len(alice_bits), sample_size, replace=False, shuffle=False)
 
-    errors = np.sum(alice_bits[sample_idx] != bob_bits[sample_idx])
+    errors = np.count_nonzero(alice_bits[sample_idx] ^ bob_bits[sample_idx])
     qber = errors / sample_size
 
     qber_low, qber_high = qber_confidence_interval(qber, sample_size)
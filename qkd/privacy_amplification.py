@@ -1,21 +1,142 @@
+import concurrent.futures
+import functools
+import os
+import secrets
+
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from qkd.bits import pack_bits, popcount
+
+# Upper bound on the unpacked bytes of Toeplitz rows packed at once
+_ROW_BLOCK_BYTES = 1 << 24
+
+# Threads hashing row blocks in parallel (numpy releases the GIL inside the kernels).
+# Each holds a row block of up to _ROW_BLOCK_BYTES plus temporaries and the step is
+# memory-bound, so the count is capped rather than following the core count.
+_ROW_BLOCK_WORKERS = min(8, os.cpu_count() or 1)
+
+# Above this many key-bit x output-bit products the FFT convolution beats packed rows
+_FFT_MIN_WORK = 1 << 23
 
+# Largest distance from an integer accepted in the FFT sums before they are rounded
+_FFT_ROUNDING_TOLERANCE = 0.25
+
+# Bits removed from the final key on top of the leakage and entropy terms
+SAFETY_MARGIN = 50
+
+# Streaming runs see the same few QBER bounds over and over
+@functools.lru_cache(maxsize=1024)
 def binary_entropy(p):
     if p <= 0 or p >= 1:
         return 0
     return -p * np.log2(p) - (1 - p) * np.log2(1 - p)
 
-def toeplitz_hash(key, output_length, seed=None):
+def binary_entropy_vec(p):
+    # binary_entropy over a whole array of probabilities in one pass (0 outside (0, 1))
+    p = np.asarray(p, dtype=np.float64)
+    inside = (p > 0) & (p < 1)
+    q = np.where(inside, p, 0.5)
+    return np.where(inside, -q * np.log2(q) - (1 - q) * np.log2(1 - q), 0.0)
+
+def secure_key_length(n, qber, leaked_bits, safety_margin=SAFETY_MARGIN):
+    # Secure key length after PA: n - leaked_bits - n*h(qber) - safety_margin, at least 0
+    return max(0, int(n - leaked_bits - n * binary_entropy(qber) - safety_margin))
 
+def toeplitz_hash(key, output_length, seed=None, rng=None, seed_fft=None):
+    # Returns (hashed_key, seed, seed_fft). seed_fft is the seed's spectrum when the
+    # FFT path ran (None otherwise); pass it back together with the same seed to hash
+    # another key of the same length (e.g. Bob's) without transforming the seed again.
+
+    key = np.asarray(key, dtype=np.uint8)
     n = len(key)
 
     if seed is None:
-        seed = np.random.randint(0, 2, n + output_length - 1, dtype=np.uint8)
+        # Whole random bytes, unpacked to bits. Without an rng (reproducible runs pass
+        # one) the seed comes from the OS CSPRNG.
+        seed_length = n + output_length - 1
+        seed_bytes = secrets.token_bytes((seed_length + 7) // 8) if rng is None \
+            else rng.bytes((seed_length + 7) // 8)
+        seed = np.unpackbits(np.frombuffer(seed_bytes, dtype=np.uint8), count=seed_length)
+
+    if n == 0:
+        return np.zeros(output_length, dtype=np.uint8), seed, seed_fft
 
-    # Toeplitz matrix-vector multiplication
+    if n * output_length >= _FFT_MIN_WORK:
+        if seed_fft is None:
+            seed_fft = np.fft.rfft(seed, _fast_fft_length(n + output_length - 1))
+        hashed_key = _toeplitz_fft(key, seed_fft, output_length)
+        if hashed_key is not None:
+            return hashed_key, seed, seed_fft
+    return _toeplitz_packed(key, seed, output_length), seed, seed_fft
+
+
+def _toeplitz_fft(key, seed_fft, output_length):
+    # Output bit i is sum_j seed[i + j] * key[j] mod 2: a correlation of seed with key,
+    # i.e. entries n-1 .. n+m-2 of the convolution of seed with the reversed key.
+    # A circular convolution of length >= n+m-1 does not wrap onto those entries.
+    # Returns None if float64 round-off got too close to a half-integer to trust
+    # the rounding (very large n); the caller then uses the exact packed path.
+    n = len(key)
+    size = _fast_fft_length(n + output_length - 1)
+    spectrum = seed_fft * np.fft.rfft(key[::-1], size)
+    sums = np.fft.irfft(spectrum, size)[n - 1:n - 1 + output_length]
+    rounded = np.rint(sums)
+    if np.max(np.abs(sums - rounded)) >= _FFT_ROUNDING_TOLERANCE:
+        return None
+    return (rounded.astype(np.int64) & 1).astype(np.uint8)
+
+
+def _fast_fft_length(size):
+    # Smallest 2^a * 3^b * 5^c >= size. pocketfft is much slower on lengths with
+    # large prime factors, and n+m-1 rarely avoids them.
+    best = 1 << max(0, (size - 1).bit_length())
+    power_of_5 = 1
+    while power_of_5 < best:
+        odd_part = power_of_5
+        while odd_part < best:
+            quotient = -(-size // odd_part)
+            best = min(best, odd_part << max(0, (quotient - 1).bit_length()))
+            odd_part *= 3
+        power_of_5 *= 5
+    return best
+
+
+def _toeplitz_packed(key, seed, output_length):
+    # Toeplitz matrix-vector multiplication over GF(2): row i is seed[i:i + n].
+    # The seed is packed once per bit offset r = 0..7. Rows with i % 8 == r are then
+    # byte-aligned windows of that packed copy, so a row costs n/8 bytes instead of
+    # being packed from n unpacked bytes. Window bits past n meet the zero padding of
+    # the packed key. Each output bit is the parity of popcount(row & key).
+    # Row blocks write disjoint output bits, so large inputs hash them on a thread pool.
+    n = len(key)
     hashed_key = np.zeros(output_length, dtype=np.uint8)
+    key_words = pack_bits(key)
+    row_bytes = len(key_words) * 8
+    rows_per_block = max(1, _ROW_BLOCK_BYTES // row_bytes)
+
+    def hash_rows(offset, rows, start, stop):
+        row_words = np.ascontiguousarray(rows[start:stop]).view('<u8')
+        hashed_key[offset + 8 * start:offset + 8 * stop:8] = \
+            popcount(row_words & key_words).sum(axis=1) & 1
+
+    blocks = []
+    for offset in range(min(8, output_length)):
+        row_count = (output_length - offset + 7) // 8
+        packed_seed = np.packbits(seed[offset:], bitorder='little')
+        shifted = np.zeros(max(len(packed_seed), row_count - 1 + row_bytes), dtype=np.uint8)
+        shifted[:len(packed_seed)] = packed_seed
+        rows = sliding_window_view(shifted, row_bytes)
+        for start in range(0, row_count, rows_per_block):
+            blocks.append((offset, rows, start, min(start + rows_per_block, row_count)))
 
-    for i in range(output_length):
-        hashed_key[i] = np.sum(seed[i:i + n] * key) % 2
+    # Threads only pay off once some bit offset spans several blocks
+    if _ROW_BLOCK_WORKERS > 1 and len(blocks) > 8:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=_ROW_BLOCK_WORKERS) as executor:
+            for _ in executor.map(lambda block: hash_rows(*block), blocks):
+                pass
+    else:
+        for block in blocks:
+            hash_rows(*block)
 
-    return hashed_key,seed
\ No newline at end of file
+    return hashed_key
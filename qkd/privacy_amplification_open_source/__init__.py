@@ -1,9 +1,3 @@
-import numpy as np
+from qkd.privacy_amplification import binary_entropy, binary_entropy_vec
 
-from .universal_hashing import HashingAlgorithm, MODEL_1
-
-
-def binary_entropy(p):
-	if p <= 0 or p >= 1:
-		return 0
-	return -p * np.log2(p) - (1 - p) * np.log2(1 - p)
\ No newline at end of file
+from .universal_hashing import HashingAlgorithm, MODEL_1
\ No newline at end of file
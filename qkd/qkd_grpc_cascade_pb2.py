@@ -24,27 +24,25 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16qkd_grpc_cascade.proto\x12\x03qkd\"/\n\rParityRequest\x12\x1e\n\x06\x62locks\x18\x01 \x03(\x0b\x32\x0e.qkd.BlockInfo\"G\n\tBlockInfo\x12\x12\n\nshuffle_id\x18\x01 \x01(\t\x12\x13\n\x0bstart_index\x18\x02 \x01(\x05\x12\x11\n\tend_index\x18\x03 \x01(\x05\"\"\n\x0eParityResponse\x12\x10\n\x08parities\x18\x01 \x03(\x05\"&\n\x0cStartRequest\x12\x16\n\x0e\x61lgorithm_name\x18\x01 \x01(\t\"$\n\nEndRequest\x12\x16\n\x0e\x61lgorithm_name\x18\x01 \x01(\t\"!\n\x0ePEIndexRequest\x12\x0f\n\x07indexes\x18\x01 \x03(\x05\"\x07\n\x05\x45mpty2\xf4\x01\n\x0e\x43\x61scadeService\x12\x36\n\x0b\x41skParities\x12\x12.qkd.ParityRequest\x1a\x13.qkd.ParityResponse\x12\x34\n\x13StartReconciliation\x12\x11.qkd.StartRequest\x1a\n.qkd.Empty\x12\x30\n\x11\x45ndReconciliation\x12\x0f.qkd.EndRequest\x1a\n.qkd.Empty\x12\x42\n\x1fShareParameterEstimationIndexes\x12\x13.qkd.PEIndexRequest\x1a\n.qkd.Emptyb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16qkd_grpc_cascade.proto\x12\x03qkd\"\x95\x01\n\rParityRequest\x12\x1e\n\x06\x62locks\x18\x01 \x03(\x0b\x32\x0e.qkd.BlockInfo\x12\x13\n\x0bshuffle_ids\x18\x02 \x03(\t\x12\x14\n\x0cshuffle_refs\x18\x03 \x03(\r\x12\x0e\n\x06starts\x18\x04 \x03(\r\x12\x0c\n\x04\x65nds\x18\x05 \x03(\r\x12\x1b\n\x13stream_shuffle_refs\x18\x06 \x03(\r\"G\n\tBlockInfo\x12\x12\n\nshuffle_id\x18\x01 \x01(\t\x12\x13\n\x0bstart_index\x18\x02 \x01(\x05\x12\x11\n\tend_index\x18\x03 \x01(\x05\"H\n\x0eParityResponse\x12\x17\n\x0fparities_packed\x18\x02 \x01(\x0c\x12\r\n\x05\x63ount\x18\x03 \x01(\rJ\x04\x08\x01\x10\x02R\x08parities\"&\n\x0cStartRequest\x12\x16\n\x0e\x61lgorithm_name\x18\x01 \x01(\t\"$\n\nEndRequest\x12\x16\n\x0e\x61lgorithm_name\x18\x01 \x01(\t\"\x07\n\x05\x45mpty2\xf2\x01\n\x0e\x43\x61scadeService\x12\x36\n\x0b\x41skParities\x12\x12.qkd.ParityRequest\x1a\x13.qkd.ParityResponse\x12@\n\x11\x41skParitiesStream\x12\x12.qkd.ParityRequest\x1a\x13.qkd.ParityResponse(\x01\x30\x01\x12\x34\n\x13StartReconciliation\x12\x11.qkd.StartRequest\x1a\n.qkd.Empty\x12\x30\n\x11\x45ndReconciliation\x12\x0f.qkd.EndRequest\x1a\n.qkd.Emptyb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'qkd_grpc_cascade_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_PARITYREQUEST']._serialized_start=31
-  _globals['_PARITYREQUEST']._serialized_end=78
-  _globals['_BLOCKINFO']._serialized_start=80
-  _globals['_BLOCKINFO']._serialized_end=151
-  _globals['_PARITYRESPONSE']._serialized_start=153
-  _globals['_PARITYRESPONSE']._serialized_end=187
-  _globals['_STARTREQUEST']._serialized_start=189
-  _globals['_STARTREQUEST']._serialized_end=227
-  _globals['_ENDREQUEST']._serialized_start=229
-  _globals['_ENDREQUEST']._serialized_end=265
-  _globals['_PEINDEXREQUEST']._serialized_start=267
-  _globals['_PEINDEXREQUEST']._serialized_end=300
-  _globals['_EMPTY']._serialized_start=302
-  _globals['_EMPTY']._serialized_end=309
-  _globals['_CASCADESERVICE']._serialized_start=312
-  _globals['_CASCADESERVICE']._serialized_end=556
+  _globals['_PARITYREQUEST']._serialized_start=32
+  _globals['_PARITYREQUEST']._serialized_end=181
+  _globals['_BLOCKINFO']._serialized_start=183
+  _globals['_BLOCKINFO']._serialized_end=254
+  _globals['_PARITYRESPONSE']._serialized_start=256
+  _globals['_PARITYRESPONSE']._serialized_end=328
+  _globals['_STARTREQUEST']._serialized_start=330
+  _globals['_STARTREQUEST']._serialized_end=368
+  _globals['_ENDREQUEST']._serialized_start=370
+  _globals['_ENDREQUEST']._serialized_end=406
+  _globals['_EMPTY']._serialized_start=408
+  _globals['_EMPTY']._serialized_end=415
+  _globals['_CASCADESERVICE']._serialized_start=418
+  _globals['_CASCADESERVICE']._serialized_end=660
 # @@protoc_insertion_point(module_scope)
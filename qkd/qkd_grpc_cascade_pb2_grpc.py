@@ -26,7 +26,8 @@ if _version_not_supported:
 
 
 class CascadeServiceStub(object):
-    """Missing associated documentation comment in .proto file."""
+    """Service que Alice offre à Bob
+    """
 
     def __init__(self, channel):
         """Constructor.
@@ -39,6 +40,11 @@ class CascadeServiceStub(object):
                 request_serializer=qkd__grpc__cascade__pb2.ParityRequest.SerializeToString,
                 response_deserializer=qkd__grpc__cascade__pb2.ParityResponse.FromString,
                 _registered_method=True)
+        self.AskParitiesStream = channel.stream_stream(
+                '/qkd.CascadeService/AskParitiesStream',
+                request_serializer=qkd__grpc__cascade__pb2.ParityRequest.SerializeToString,
+                response_deserializer=qkd__grpc__cascade__pb2.ParityResponse.FromString,
+                _registered_method=True)
         self.StartReconciliation = channel.unary_unary(
                 '/qkd.CascadeService/StartReconciliation',
                 request_serializer=qkd__grpc__cascade__pb2.StartRequest.SerializeToString,
@@ -49,36 +55,36 @@ class CascadeServiceStub(object):
                 request_serializer=qkd__grpc__cascade__pb2.EndRequest.SerializeToString,
                 response_deserializer=qkd__grpc__cascade__pb2.Empty.FromString,
                 _registered_method=True)
-        self.ShareParameterEstimationIndexes = channel.unary_unary(
-                '/qkd.CascadeService/ShareParameterEstimationIndexes',
-                request_serializer=qkd__grpc__cascade__pb2.PEIndexRequest.SerializeToString,
-                response_deserializer=qkd__grpc__cascade__pb2.Empty.FromString,
-                _registered_method=True)
 
 
 class CascadeServiceServicer(object):
-    """Missing associated documentation comment in .proto file."""
+    """Service que Alice offre à Bob
+    """
 
     def AskParities(self, request, context):
-        """Missing associated documentation comment in .proto file."""
+        """Bob demande les parités de plusieurs blocs
+        """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
-    def StartReconciliation(self, request, context):
-        """Missing associated documentation comment in .proto file."""
+    def AskParitiesStream(self, request_iterator, context):
+        """Variante en flux: toutes les requêtes d'une reconciliation passent par un seul
+        stream HTTP/2, une ParityResponse par ParityRequest, dans le même ordre
+        """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
-    def EndReconciliation(self, request, context):
-        """Missing associated documentation comment in .proto file."""
+    def StartReconciliation(self, request, context):
+        """Bob signale le début d'une nouvelle session Cascade
+        """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
-    def ShareParameterEstimationIndexes(self, request, context):
-        """NOUVEAU: Bob envoie les index à révéler pour PE
+    def EndReconciliation(self, request, context):
+        """Bob signale la fin de la session
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -92,6 +98,11 @@ def add_CascadeServiceServicer_to_server(servicer, server):
                     request_deserializer=qkd__grpc__cascade__pb2.ParityRequest.FromString,
                     response_serializer=qkd__grpc__cascade__pb2.ParityResponse.SerializeToString,
             ),
+            'AskParitiesStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.AskParitiesStream,
+                    request_deserializer=qkd__grpc__cascade__pb2.ParityRequest.FromString,
+                    response_serializer=qkd__grpc__cascade__pb2.ParityResponse.SerializeToString,
+            ),
             'StartReconciliation': grpc.unary_unary_rpc_method_handler(
                     servicer.StartReconciliation,
                     request_deserializer=qkd__grpc__cascade__pb2.StartRequest.FromString,
@@ -102,11 +113,6 @@ def add_CascadeServiceServicer_to_server(servicer, server):
                     request_deserializer=qkd__grpc__cascade__pb2.EndRequest.FromString,
                     response_serializer=qkd__grpc__cascade__pb2.Empty.SerializeToString,
             ),
-            'ShareParameterEstimationIndexes': grpc.unary_unary_rpc_method_handler(
-                    servicer.ShareParameterEstimationIndexes,
-                    request_deserializer=qkd__grpc__cascade__pb2.PEIndexRequest.FromString,
-                    response_serializer=qkd__grpc__cascade__pb2.Empty.SerializeToString,
-            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'qkd.CascadeService', rpc_method_handlers)
@@ -116,7 +122,8 @@ def add_CascadeServiceServicer_to_server(servicer, server):
 
  # This class is part of an EXPERIMENTAL API.
 class CascadeService(object):
-    """Missing associated documentation comment in .proto file."""
+    """Service que Alice offre à Bob
+    """
 
     @staticmethod
     def AskParities(request,
@@ -146,7 +153,7 @@ class CascadeService(object):
             _registered_method=True)
 
     @staticmethod
-    def StartReconciliation(request,
+    def AskParitiesStream(request_iterator,
             target,
             options=(),
             channel_credentials=None,
@@ -156,12 +163,12 @@ class CascadeService(object):
             wait_for_ready=None,
             timeout=None,
             metadata=None):
-        return grpc.experimental.unary_unary(
-            request,
+        return grpc.experimental.stream_stream(
+            request_iterator,
             target,
-            '/qkd.CascadeService/StartReconciliation',
-            qkd__grpc__cascade__pb2.StartRequest.SerializeToString,
-            qkd__grpc__cascade__pb2.Empty.FromString,
+            '/qkd.CascadeService/AskParitiesStream',
+            qkd__grpc__cascade__pb2.ParityRequest.SerializeToString,
+            qkd__grpc__cascade__pb2.ParityResponse.FromString,
             options,
             channel_credentials,
             insecure,
@@ -173,7 +180,7 @@ class CascadeService(object):
             _registered_method=True)
 
     @staticmethod
-    def EndReconciliation(request,
+    def StartReconciliation(request,
             target,
             options=(),
             channel_credentials=None,
@@ -186,8 +193,8 @@ class CascadeService(object):
         return grpc.experimental.unary_unary(
             request,
             target,
-            '/qkd.CascadeService/EndReconciliation',
-            qkd__grpc__cascade__pb2.EndRequest.SerializeToString,
+            '/qkd.CascadeService/StartReconciliation',
+            qkd__grpc__cascade__pb2.StartRequest.SerializeToString,
             qkd__grpc__cascade__pb2.Empty.FromString,
             options,
             channel_credentials,
@@ -200,7 +207,7 @@ class CascadeService(object):
             _registered_method=True)
 
     @staticmethod
-    def ShareParameterEstimationIndexes(request,
+    def EndReconciliation(request,
             target,
             options=(),
             channel_credentials=None,
@@ -213,8 +220,8 @@ class CascadeService(object):
         return grpc.experimental.unary_unary(
             request,
             target,
-            '/qkd.CascadeService/ShareParameterEstimationIndexes',
-            qkd__grpc__cascade__pb2.PEIndexRequest.SerializeToString,
+            '/qkd.CascadeService/EndReconciliation',
+            qkd__grpc__cascade__pb2.EndRequest.SerializeToString,
             qkd__grpc__cascade__pb2.Empty.FromString,
             options,
             channel_credentials,
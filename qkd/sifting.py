@@ -1,17 +1,136 @@
+import collections
+import concurrent.futures
+import os
+
 import numpy as np
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+from qkd.bits import pack_bits, unpack_bits
+from qkd.csv_loader import read_csv_chunks, csv_byte_ranges, read_csv_range
+
 def sifting(df):
+    # df: pandas DataFrame, dict of numpy columns or pyarrow Table (see qkd.csv_loader)
+
+    print("Initial raw size:", len(df['tx_state']))
+
+    return _sift_columns(df)
+
+
+def _sift_columns(df):
+    # Sifting without the report, for worker processes whose output would
+    # interleave with the parent's
 
-    print("Initial raw size:", len(df))
+    if pa is not None and isinstance(df, pa.Table):
+        return _sifting_arrow(df)
 
-    if 'decoy_level' in df.columns:
-        df_signal = df[df['decoy_level'] == 0]
+    matching = np.asarray(df["matching_basis"], dtype=bool)
+
+    if 'decoy_level' in df:
+        mask = matching & (np.asarray(df['decoy_level']) == 0)
     else:
-        df_signal = df
-        
-    sifted = df_signal[df_signal["matching_basis"] == True]
+        mask = matching
+
+    # Masking already yields new arrays; only convert (copy again) if not uint8
+    alice_bits = np.asarray(df["tx_state"])[mask].astype(np.uint8, copy=False)
+    bob_bits = np.asarray(df["rx_state"])[mask].astype(np.uint8, copy=False)
+
+    return alice_bits, bob_bits
+
+
+def _sifting_arrow(table):
+    # Filter on the Arrow buffers: the bit-packed matching_basis column is never
+    # expanded to a numpy bool array and only the kept tx/rx rows are converted.
+    mask = table.column('matching_basis')
+    if 'decoy_level' in table.column_names:
+        mask = pc.and_(mask, pc.equal(table.column('decoy_level'), 0))
+    sifted = table.select(['tx_state', 'rx_state']).filter(mask)
+
+    alice_bits = sifted.column('tx_state').to_numpy().astype(np.uint8, copy=False)
+    bob_bits = sifted.column('rx_state').to_numpy().astype(np.uint8, copy=False)
+
+    return alice_bits, bob_bits
+
+
+def concatenate_chunks(chunks, total_size):
+    """
+    Join sifted chunks into one preallocated array.
+
+    Each chunk is dropped as soon as it has been copied. The output pages are only
+    committed as they are written, so peak memory stays near one copy of the data
+    plus one chunk instead of the two full copies np.concatenate needs.
+
+    Args:
+        chunks (list): uint8 arrays to join, in order. The list is emptied.
+        total_size (int): Sum of the chunk lengths
+
+    Returns:
+        numpy array of uint8
+    """
+    out = np.empty(total_size, dtype=np.uint8)
+    offset = 0
+    chunks.reverse()
+    while chunks:
+        chunk = chunks.pop()
+        out[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return out
+
+
+def _sift_csv_range(csv_file, start, end):
+    # Runs in a worker process. The sifted bits are sent back packed into uint64
+    # words, 8x less data to pickle than one bit per byte.
+    chunk = read_csv_range(csv_file, start, end)
+    alice_bits, bob_bits = _sift_columns(chunk)
+    return pack_bits(alice_bits), pack_bits(bob_bits), len(alice_bits), len(chunk['tx_state'])
+
+
+def _unpack_sifted(result):
+    # Runs in the parent as results are consumed in file order, so the report
+    # lines up with the caller's per-chunk output
+    alice_words, bob_words, sifted_size, raw_rows = result
+    print("Initial raw size:", raw_rows)
+    return unpack_bits(alice_words, sifted_size), unpack_bits(bob_words, sifted_size), raw_rows
+
+
+def sift_csv_chunks(csv_file, chunk_size=1_000_000, workers=None):
+    """
+    Read and sift a raw QKD CSV file chunk by chunk.
+
+    With more than one worker, the file is split into line-aligned byte ranges of
+    exactly chunk_size rows and each range is parsed and sifted in its own process.
+    Only the sifted bits come back, packed 64 per word. At most two ranges per worker
+    are in flight, so memory stays bounded on large files, and range boundaries are
+    only scanned for as ranges are submitted.
+
+    Args:
+        csv_file: Path to CSV file
+        chunk_size: Number of rows per chunk. Chunk N always holds rows
+            [N*chunk_size, (N+1)*chunk_size), whatever the number of workers.
+        workers: Number of worker processes, defaults to os.cpu_count()
+
+    Yields:
+        (alice_bits, bob_bits, raw_rows) for each chunk, in file order
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
 
-    alice_bits = sifted["tx_state"].to_numpy(dtype=np.uint8)
-    bob_bits = sifted["rx_state"].to_numpy(dtype=np.uint8)
+    if workers <= 1:
+        for chunk in read_csv_chunks(csv_file, chunk_size):
+            alice_bits, bob_bits = sifting(chunk)
+            yield alice_bits, bob_bits, len(chunk['tx_state'])
+        return
 
-    return alice_bits, bob_bits
\ No newline at end of file
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for start, end in csv_byte_ranges(csv_file, chunk_size):
+            pending.append(executor.submit(_sift_csv_range, csv_file, start, end))
+            if len(pending) >= 2 * workers:
+                yield _unpack_sifted(pending.popleft().result())
+        while pending:
+            yield _unpack_sifted(pending.popleft().result())